@@ -5,15 +5,89 @@ d = { 'settings': { 'branch': 'master',
                 'doc_host': 'https://amaiya.github.io',
                 'git_url': 'https://github.com/amaiya/onprem',
                 'lib_path': 'onprem'},
-  'syms': { 'onprem.console': {},
+  'syms': { 'onprem.cache': { 'onprem.cache.AnswerCache': ('cache.html#answercache', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.__init__': ('cache.html#answercache.__init__', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.__len__': ('cache.html#answercache.__len__', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache._invalidate': ('cache.html#answercache._invalidate', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache._normalize': ('cache.html#answercache._normalize', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.clear': ('cache.html#answercache.clear', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.get': ('cache.html#answercache.get', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.set': ('cache.html#answercache.set', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.sources_key': ('cache.html#answercache.sources_key', 'onprem/cache.py'),
+                              'onprem.cache.AnswerCache.stats': ('cache.html#answercache.stats', 'onprem/cache.py'),
+                              'onprem.cache.CachedEmbeddings': ('cache.html#cachedembeddings', 'onprem/cache.py'),
+                              'onprem.cache.CachedEmbeddings.__init__': ('cache.html#cachedembeddings.__init__', 'onprem/cache.py'),
+                              'onprem.cache.CachedEmbeddings.embed_documents': ( 'cache.html#cachedembeddings.embed_documents',
+                                                                                 'onprem/cache.py'),
+                              'onprem.cache.CachedEmbeddings.embed_query': ('cache.html#cachedembeddings.embed_query', 'onprem/cache.py'),
+                              'onprem.cache.CachedQueryEmbeddings': ('cache.html#cachedqueryembeddings', 'onprem/cache.py'),
+                              'onprem.cache.CachedQueryEmbeddings.__init__': ( 'cache.html#cachedqueryembeddings.__init__',
+                                                                               'onprem/cache.py'),
+                              'onprem.cache.CachedQueryEmbeddings.embed_documents': ( 'cache.html#cachedqueryembeddings.embed_documents',
+                                                                                      'onprem/cache.py'),
+                              'onprem.cache.CachedQueryEmbeddings.embed_query': ( 'cache.html#cachedqueryembeddings.embed_query',
+                                                                                  'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache': ('cache.html#embeddingcache', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache.__init__': ('cache.html#embeddingcache.__init__', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache.__len__': ('cache.html#embeddingcache.__len__', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache._key': ('cache.html#embeddingcache._key', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache._open_matrix': ('cache.html#embeddingcache._open_matrix', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache.get': ('cache.html#embeddingcache.get', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache.set': ('cache.html#embeddingcache.set', 'onprem/cache.py'),
+                              'onprem.cache.EmbeddingCache.stats': ('cache.html#embeddingcache.stats', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache': ('cache.html#lrucache', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.__contains__': ('cache.html#lrucache.__contains__', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.__init__': ('cache.html#lrucache.__init__', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.__len__': ('cache.html#lrucache.__len__', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.clear': ('cache.html#lrucache.clear', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.get': ('cache.html#lrucache.get', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.pop': ('cache.html#lrucache.pop', 'onprem/cache.py'),
+                              'onprem.cache.LRUCache.set': ('cache.html#lrucache.set', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache': ('cache.html#responsecache', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.__init__': ('cache.html#responsecache.__init__', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.__len__': ('cache.html#responsecache.__len__', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache._evict': ('cache.html#responsecache._evict', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache._expired': ('cache.html#responsecache._expired', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.clear': ('cache.html#responsecache.clear', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.delete': ('cache.html#responsecache.delete', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.get': ('cache.html#responsecache.get', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.set': ('cache.html#responsecache.set', 'onprem/cache.py'),
+                              'onprem.cache.ResponseCache.stats': ('cache.html#responsecache.stats', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache': ('cache.html#retrievalcache', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.__init__': ('cache.html#retrievalcache.__init__', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.clear': ('cache.html#retrievalcache.clear', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.get': ('cache.html#retrievalcache.get', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.get_embedding': ('cache.html#retrievalcache.get_embedding', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.set': ('cache.html#retrievalcache.set', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.set_embedding': ('cache.html#retrievalcache.set_embedding', 'onprem/cache.py'),
+                              'onprem.cache.RetrievalCache.stats': ('cache.html#retrievalcache.stats', 'onprem/cache.py'),
+                              'onprem.cache.hash_key': ('cache.html#hash_key', 'onprem/cache.py'),
+                              'onprem.cache.normalize_text': ('cache.html#normalize_text', 'onprem/cache.py'),
+                              'onprem.cache.open_memmap': ('cache.html#open_memmap', 'onprem/cache.py')},
+            'onprem.console': {},
             'onprem.core': { 'onprem.core.AnswerConversationBufferMemory': ('core.html#answerconversationbuffermemory', 'onprem/core.py'),
                              'onprem.core.AnswerConversationBufferMemory.save_context': ( 'core.html#answerconversationbuffermemory.save_context',
                                                                                           'onprem/core.py'),
                              'onprem.core.LLM': ('core.html#llm', 'onprem/core.py'),
                              'onprem.core.LLM.__init__': ('core.html#llm.__init__', 'onprem/core.py'),
+                             'onprem.core.LLM._arun': ('core.html#llm._arun', 'onprem/core.py'),
+                             'onprem.core.LLM._ask_cached': ('core.html#llm._ask_cached', 'onprem/core.py'),
+                             'onprem.core.LLM._cached_response': ('core.html#llm._cached_response', 'onprem/core.py'),
+                             'onprem.core.LLM._format_prompt': ('core.html#llm._format_prompt', 'onprem/core.py'),
+                             'onprem.core.LLM._get_semaphore': ('core.html#llm._get_semaphore', 'onprem/core.py'),
+                             'onprem.core.LLM._prompt_batch': ('core.html#llm._prompt_batch', 'onprem/core.py'),
+                             'onprem.core.LLM._response_cache_key': ('core.html#llm._response_cache_key', 'onprem/core.py'),
+                             'onprem.core.LLM._tokenize': ('core.html#llm._tokenize', 'onprem/core.py'),
+                             'onprem.core.LLM._truncate_at_stop': ('core.html#llm._truncate_at_stop', 'onprem/core.py'),
+                             'onprem.core.LLM.aask': ('core.html#llm.aask', 'onprem/core.py'),
+                             'onprem.core.LLM.achat': ('core.html#llm.achat', 'onprem/core.py'),
+                             'onprem.core.LLM.aprompt': ('core.html#llm.aprompt', 'onprem/core.py'),
                              'onprem.core.LLM.ask': ('core.html#llm.ask', 'onprem/core.py'),
+                             'onprem.core.LLM.astream': ('core.html#llm.astream', 'onprem/core.py'),
+                             'onprem.core.LLM.cache_stats': ('core.html#llm.cache_stats', 'onprem/core.py'),
                              'onprem.core.LLM.chat': ('core.html#llm.chat', 'onprem/core.py'),
                              'onprem.core.LLM.check_model': ('core.html#llm.check_model', 'onprem/core.py'),
+                             'onprem.core.LLM.count_tokens': ('core.html#llm.count_tokens', 'onprem/core.py'),
                              'onprem.core.LLM.download_model': ('core.html#llm.download_model', 'onprem/core.py'),
                              'onprem.core.LLM.ingest': ('core.html#llm.ingest', 'onprem/core.py'),
                              'onprem.core.LLM.is_azure': ('core.html#llm.is_azure', 'onprem/core.py'),
@@ -22,12 +96,16 @@ d = { 'settings': { 'branch': 'master',
                              'onprem.core.LLM.is_local': ('core.html#llm.is_local', 'onprem/core.py'),
                              'onprem.core.LLM.is_local_api': ('core.html#llm.is_local_api', 'onprem/core.py'),
                              'onprem.core.LLM.is_openai_model': ('core.html#llm.is_openai_model', 'onprem/core.py'),
+                             'onprem.core.LLM.load_answer_cache': ('core.html#llm.load_answer_cache', 'onprem/core.py'),
                              'onprem.core.LLM.load_chatqa': ('core.html#llm.load_chatqa', 'onprem/core.py'),
                              'onprem.core.LLM.load_ingester': ('core.html#llm.load_ingester', 'onprem/core.py'),
                              'onprem.core.LLM.load_llm': ('core.html#llm.load_llm', 'onprem/core.py'),
                              'onprem.core.LLM.load_qa': ('core.html#llm.load_qa', 'onprem/core.py'),
+                             'onprem.core.LLM.load_retriever': ('core.html#llm.load_retriever', 'onprem/core.py'),
                              'onprem.core.LLM.load_vectordb': ('core.html#llm.load_vectordb', 'onprem/core.py'),
                              'onprem.core.LLM.prompt': ('core.html#llm.prompt', 'onprem/core.py'),
+                             'onprem.core.LLM.prompt_batch': ('core.html#llm.prompt_batch', 'onprem/core.py'),
+                             'onprem.core.LLM.tokenize': ('core.html#llm.tokenize', 'onprem/core.py'),
                              'onprem.core.LLM.update_max_tokens': ('core.html#llm.update_max_tokens', 'onprem/core.py'),
                              'onprem.core.LLM.update_stop': ('core.html#llm.update_stop', 'onprem/core.py')},
             'onprem.guider': { 'onprem.guider.Guider': ('guider.html#guider', 'onprem/guider.py'),
@@ -35,6 +113,25 @@ d = { 'settings': { 'branch': 'master',
                                'onprem.guider.Guider.prompt': ('guider.html#guider.prompt', 'onprem/guider.py')},
             'onprem.hf.base': { 'onprem.hf.base.Pipeline': ('hf.base.html#pipeline', 'onprem/hf/base.py'),
                                 'onprem.hf.base.Pipeline.batch': ('hf.base.html#pipeline.batch', 'onprem/hf/base.py')},
+            'onprem.hf.benchmark': { 'onprem.hf.benchmark.Benchmark': ('hf.benchmark.html#benchmark', 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.__call__': ( 'hf.benchmark.html#benchmark.__call__',
+                                                                                 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.__init__': ( 'hf.benchmark.html#benchmark.__init__',
+                                                                                 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.data': ('hf.benchmark.html#benchmark.data', 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.environment': ( 'hf.benchmark.html#benchmark.environment',
+                                                                                    'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.export': ( 'hf.benchmark.html#benchmark.export',
+                                                                               'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.measure': ( 'hf.benchmark.html#benchmark.measure',
+                                                                                'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.model': ('hf.benchmark.html#benchmark.model', 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.peakrss': ( 'hf.benchmark.html#benchmark.peakrss',
+                                                                                'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.run': ('hf.benchmark.html#benchmark.run', 'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.Benchmark.threads': ( 'hf.benchmark.html#benchmark.threads',
+                                                                                'onprem/hf/benchmark.py'),
+                                     'onprem.hf.benchmark.main': ('hf.benchmark.html#main', 'onprem/hf/benchmark.py')},
             'onprem.hf.data.base': { 'onprem.hf.data.base.Data': ('hf.data.base.html#data', 'onprem/hf/data/base.py'),
                                      'onprem.hf.data.base.Data.__call__': ('hf.data.base.html#data.__call__', 'onprem/hf/data/base.py'),
                                      'onprem.hf.data.base.Data.__init__': ('hf.data.base.html#data.__init__', 'onprem/hf/data/base.py'),
@@ -197,27 +294,87 @@ d = { 'settings': { 'branch': 'master',
                                                                                     'onprem/hf/train/mlonnx.py'),
                                         'onprem.hf.train.mlonnx.MLOnnx.__init__': ( 'hf.train.mlonnx.html#mlonnx.__init__',
                                                                                     'onprem/hf/train/mlonnx.py')},
-            'onprem.ingest': { 'onprem.ingest.Ingester': ('ingest.html#ingester', 'onprem/ingest.py'),
+            'onprem.ingest': { 'onprem.ingest.Deduplicator': ('ingest.html#deduplicator', 'onprem/ingest.py'),
+                               'onprem.ingest.Deduplicator.__call__': ('ingest.html#deduplicator.__call__', 'onprem/ingest.py'),
+                               'onprem.ingest.Deduplicator.__init__': ('ingest.html#deduplicator.__init__', 'onprem/ingest.py'),
+                               'onprem.ingest.Deduplicator._merge': ('ingest.html#deduplicator._merge', 'onprem/ingest.py'),
+                               'onprem.ingest.Deduplicator.pop_updated': ('ingest.html#deduplicator.pop_updated', 'onprem/ingest.py'),
+                               'onprem.ingest.Deduplicator.signature': ('ingest.html#deduplicator.signature', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine': ('ingest.html#embeddingengine', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.__init__': ('ingest.html#embeddingengine.__init__', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.close': ('ingest.html#embeddingengine.close', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.embed_documents': ( 'ingest.html#embeddingengine.embed_documents',
+                                                                                  'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.embed_query': ('ingest.html#embeddingengine.embed_query', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.start': ('ingest.html#embeddingengine.start', 'onprem/ingest.py'),
+                               'onprem.ingest.EmbeddingEngine.stats': ('ingest.html#embeddingengine.stats', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester': ('ingest.html#ingester', 'onprem/ingest.py'),
                                'onprem.ingest.Ingester.__init__': ('ingest.html#ingester.__init__', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._backfill_manifest': ('ingest.html#ingester._backfill_manifest', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._check_manifest': ('ingest.html#ingester._check_manifest', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._copy_chunks': ('ingest.html#ingester._copy_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._delete_chunks': ('ingest.html#ingester._delete_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._record_chunks': ('ingest.html#ingester._record_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._release_chunks': ('ingest.html#ingester._release_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._report_embedding_cache': ( 'ingest.html#ingester._report_embedding_cache',
+                                                                                   'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._source_chunk_ids': ('ingest.html#ingester._source_chunk_ids', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._stream_documents': ('ingest.html#ingester._stream_documents', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester._write_chunks': ('ingest.html#ingester._write_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester.delete_source': ('ingest.html#ingester.delete_source', 'onprem/ingest.py'),
                                'onprem.ingest.Ingester.get_db': ('ingest.html#ingester.get_db', 'onprem/ingest.py'),
                                'onprem.ingest.Ingester.get_embedding_model': ( 'ingest.html#ingester.get_embedding_model',
                                                                                'onprem/ingest.py'),
                                'onprem.ingest.Ingester.get_ingested_files': ('ingest.html#ingester.get_ingested_files', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester.get_sparse_index': ('ingest.html#ingester.get_sparse_index', 'onprem/ingest.py'),
                                'onprem.ingest.Ingester.ingest': ('ingest.html#ingester.ingest', 'onprem/ingest.py'),
                                'onprem.ingest.Ingester.store_documents': ('ingest.html#ingester.store_documents', 'onprem/ingest.py'),
+                               'onprem.ingest.Ingester.update_source': ('ingest.html#ingester.update_source', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest': ('ingest.html#manifest', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.__init__': ('ingest.html#manifest.__init__', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.__len__': ('ingest.html#manifest.__len__', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest._to_dict': ('ingest.html#manifest._to_dict', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.bump_version': ('ingest.html#manifest.bump_version', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.clear': ('ingest.html#manifest.clear', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.delete': ('ingest.html#manifest.delete', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.find': ('ingest.html#manifest.find', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.get': ('ingest.html#manifest.get', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.paths': ('ingest.html#manifest.paths', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.put': ('ingest.html#manifest.put', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.references': ('ingest.html#manifest.references', 'onprem/ingest.py'),
+                               'onprem.ingest.Manifest.version': ('ingest.html#manifest.version', 'onprem/ingest.py'),
                                'onprem.ingest.MyElmLoader': ('ingest.html#myelmloader', 'onprem/ingest.py'),
                                'onprem.ingest.MyElmLoader.load': ('ingest.html#myelmloader.load', 'onprem/ingest.py'),
                                'onprem.ingest.MyUnstructuredPDFLoader': ('ingest.html#myunstructuredpdfloader', 'onprem/ingest.py'),
                                'onprem.ingest.MyUnstructuredPDFLoader.load': ( 'ingest.html#myunstructuredpdfloader.load',
                                                                                'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings': ('ingest.html#onnxembeddings', 'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings.__init__': ('ingest.html#onnxembeddings.__init__', 'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings._embed': ('ingest.html#onnxembeddings._embed', 'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings.embed_documents': ( 'ingest.html#onnxembeddings.embed_documents',
+                                                                                 'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings.embed_query': ('ingest.html#onnxembeddings.embed_query', 'onprem/ingest.py'),
+                               'onprem.ingest.OnnxEmbeddings.export': ('ingest.html#onnxembeddings.export', 'onprem/ingest.py'),
                                'onprem.ingest.PDF2MarkdownLoader': ('ingest.html#pdf2markdownloader', 'onprem/ingest.py'),
                                'onprem.ingest.PDF2MarkdownLoader.load': ('ingest.html#pdf2markdownloader.load', 'onprem/ingest.py'),
+                               'onprem.ingest._embed_batch': ('ingest.html#_embed_batch', 'onprem/ingest.py'),
+                               'onprem.ingest._init_embedding_worker': ('ingest.html#_init_embedding_worker', 'onprem/ingest.py'),
+                               'onprem.ingest._is_ignored': ('ingest.html#_is_ignored', 'onprem/ingest.py'),
+                               'onprem.ingest._queue_files': ('ingest.html#_queue_files', 'onprem/ingest.py'),
                                'onprem.ingest.batchify_chunks': ('ingest.html#batchify_chunks', 'onprem/ingest.py'),
+                               'onprem.ingest.chunk_id': ('ingest.html#chunk_id', 'onprem/ingest.py'),
+                               'onprem.ingest.chunk_ids': ('ingest.html#chunk_ids', 'onprem/ingest.py'),
                                'onprem.ingest.does_vectorstore_exist': ('ingest.html#does_vectorstore_exist', 'onprem/ingest.py'),
                                'onprem.ingest.extract_files': ('ingest.html#extract_files', 'onprem/ingest.py'),
+                               'onprem.ingest.file_hash': ('ingest.html#file_hash', 'onprem/ingest.py'),
+                               'onprem.ingest.get_embeddings': ('ingest.html#get_embeddings', 'onprem/ingest.py'),
+                               'onprem.ingest.get_text_splitter': ('ingest.html#get_text_splitter', 'onprem/ingest.py'),
+                               'onprem.ingest.iter_chunk_metadata': ('ingest.html#iter_chunk_metadata', 'onprem/ingest.py'),
+                               'onprem.ingest.iter_documents': ('ingest.html#iter_documents', 'onprem/ingest.py'),
                                'onprem.ingest.load_documents': ('ingest.html#load_documents', 'onprem/ingest.py'),
                                'onprem.ingest.load_single_document': ('ingest.html#load_single_document', 'onprem/ingest.py'),
-                               'onprem.ingest.process_documents': ('ingest.html#process_documents', 'onprem/ingest.py')},
+                               'onprem.ingest.process_documents': ('ingest.html#process_documents', 'onprem/ingest.py'),
+                               'onprem.ingest.source_id': ('ingest.html#source_id', 'onprem/ingest.py')},
             'onprem.pipelines.classifier': { 'onprem.pipelines.classifier.ClassifierBase': ( 'pipelines.classifier.html#classifierbase',
                                                                                              'onprem/pipelines/classifier.py'),
                                              'onprem.pipelines.classifier.ClassifierBase.arrays2dataset': ( 'pipelines.classifier.html#classifierbase.arrays2dataset',
@@ -250,20 +407,82 @@ d = { 'settings': { 'branch': 'master',
                                                                                       'onprem/pipelines/extractor.py'),
                                             'onprem.pipelines.extractor.Extractor.__init__': ( 'pipelines.extractor.html#extractor.__init__',
                                                                                                'onprem/pipelines/extractor.py'),
+                                            'onprem.pipelines.extractor.Extractor._extract': ( 'pipelines.extractor.html#extractor._extract',
+                                                                                               'onprem/pipelines/extractor.py'),
+                                            'onprem.pipelines.extractor.Extractor._extraction_prompt': ( 'pipelines.extractor.html#extractor._extraction_prompt',
+                                                                                                         'onprem/pipelines/extractor.py'),
+                                            'onprem.pipelines.extractor.Extractor._resume': ( 'pipelines.extractor.html#extractor._resume',
+                                                                                              'onprem/pipelines/extractor.py'),
+                                            'onprem.pipelines.extractor.Extractor._segment': ( 'pipelines.extractor.html#extractor._segment',
+                                                                                               'onprem/pipelines/extractor.py'),
                                             'onprem.pipelines.extractor.Extractor.apply': ( 'pipelines.extractor.html#extractor.apply',
-                                                                                            'onprem/pipelines/extractor.py')},
+                                                                                            'onprem/pipelines/extractor.py'),
+                                            'onprem.pipelines.extractor.Extractor.iter_apply': ( 'pipelines.extractor.html#extractor.iter_apply',
+                                                                                                 'onprem/pipelines/extractor.py')},
             'onprem.pipelines.summarizer': { 'onprem.pipelines.summarizer.Summarizer': ( 'pipelines.summarizer.html#summarizer',
                                                                                          'onprem/pipelines/summarizer.py'),
                                              'onprem.pipelines.summarizer.Summarizer.__init__': ( 'pipelines.summarizer.html#summarizer.__init__',
                                                                                                   'onprem/pipelines/summarizer.py'),
                                              'onprem.pipelines.summarizer.Summarizer._map_reduce': ( 'pipelines.summarizer.html#summarizer._map_reduce',
                                                                                                      'onprem/pipelines/summarizer.py'),
+                                             'onprem.pipelines.summarizer.Summarizer._map_reduce_batch': ( 'pipelines.summarizer.html#summarizer._map_reduce_batch',
+                                                                                                           'onprem/pipelines/summarizer.py'),
+                                             'onprem.pipelines.summarizer.Summarizer._prompt_batch': ( 'pipelines.summarizer.html#summarizer._prompt_batch',
+                                                                                                       'onprem/pipelines/summarizer.py'),
                                              'onprem.pipelines.summarizer.Summarizer._refine': ( 'pipelines.summarizer.html#summarizer._refine',
                                                                                                  'onprem/pipelines/summarizer.py'),
                                              'onprem.pipelines.summarizer.Summarizer.summarize': ( 'pipelines.summarizer.html#summarizer.summarize',
                                                                                                    'onprem/pipelines/summarizer.py'),
                                              'onprem.pipelines.summarizer.Summarizer.summarize_by_concept': ( 'pipelines.summarizer.html#summarizer.summarize_by_concept',
                                                                                                               'onprem/pipelines/summarizer.py')},
+            'onprem.retrieval': { 'onprem.retrieval.BM25Index': ('retrieval.html#bm25index', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.__init__': ('retrieval.html#bm25index.__init__', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.__len__': ('retrieval.html#bm25index.__len__', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.add': ('retrieval.html#bm25index.add', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.clear': ('retrieval.html#bm25index.clear', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.delete': ('retrieval.html#bm25index.delete', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.BM25Index.search': ('retrieval.html#bm25index.search', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.CachedRetriever': ('retrieval.html#cachedretriever', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.CachedRetriever._get_relevant_documents': ( 'retrieval.html#cachedretriever._get_relevant_documents',
+                                                                                                'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker': ('retrieval.html#contextpacker', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker.__init__': ( 'retrieval.html#contextpacker.__init__',
+                                                                               'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._add': ('retrieval.html#contextpacker._add', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._context': ( 'retrieval.html#contextpacker._context',
+                                                                               'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._join': ('retrieval.html#contextpacker._join', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._merge': ('retrieval.html#contextpacker._merge', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._num_tokens': ( 'retrieval.html#contextpacker._num_tokens',
+                                                                                  'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker._truncate': ( 'retrieval.html#contextpacker._truncate',
+                                                                                'onprem/retrieval.py'),
+                                  'onprem.retrieval.ContextPacker.pack': ('retrieval.html#contextpacker.pack', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker': ('retrieval.html#crossencoderreranker', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker.__init__': ( 'retrieval.html#crossencoderreranker.__init__',
+                                                                                      'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker._predict': ( 'retrieval.html#crossencoderreranker._predict',
+                                                                                      'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker.export': ( 'retrieval.html#crossencoderreranker.export',
+                                                                                    'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker.rerank': ( 'retrieval.html#crossencoderreranker.rerank',
+                                                                                    'onprem/retrieval.py'),
+                                  'onprem.retrieval.CrossEncoderReranker.score': ( 'retrieval.html#crossencoderreranker.score',
+                                                                                   'onprem/retrieval.py'),
+                                  'onprem.retrieval.HybridRetriever': ('retrieval.html#hybridretriever', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.HybridRetriever._get_relevant_documents': ( 'retrieval.html#hybridretriever._get_relevant_documents',
+                                                                                                'onprem/retrieval.py'),
+                                  'onprem.retrieval.PackingRetriever': ('retrieval.html#packingretriever', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.PackingRetriever._get_relevant_documents': ( 'retrieval.html#packingretriever._get_relevant_documents',
+                                                                                                 'onprem/retrieval.py'),
+                                  'onprem.retrieval.RerankingRetriever': ('retrieval.html#rerankingretriever', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.RerankingRetriever._get_relevant_documents': ( 'retrieval.html#rerankingretriever._get_relevant_documents',
+                                                                                                   'onprem/retrieval.py'),
+                                  'onprem.retrieval._chunk_ordinal': ('retrieval.html#_chunk_ordinal', 'onprem/retrieval.py'),
+                                  'onprem.retrieval._text_overlap': ('retrieval.html#_text_overlap', 'onprem/retrieval.py'),
+                                  'onprem.retrieval.reciprocal_rank_fusion': ( 'retrieval.html#reciprocal_rank_fusion',
+                                                                               'onprem/retrieval.py'),
+                                  'onprem.retrieval.tokenize': ('retrieval.html#tokenize', 'onprem/retrieval.py')},
             'onprem.utils': { 'onprem.utils.df_to_md': ('utils.html#df_to_md', 'onprem/utils.py'),
                               'onprem.utils.download': ('utils.html#download', 'onprem/utils.py'),
                               'onprem.utils.get_datadir': ('utils.html#get_datadir', 'onprem/utils.py'),
@@ -271,4 +490,141 @@ d = { 'settings': { 'branch': 'master',
                               'onprem.utils.md_to_df': ('utils.html#md_to_df', 'onprem/utils.py'),
                               'onprem.utils.segment': ('utils.html#segment', 'onprem/utils.py'),
                               'onprem.utils.split_list': ('utils.html#split_list', 'onprem/utils.py')},
+            'onprem.vectorstore': { 'onprem.vectorstore.ChromaStore': ('vectorstore.html#chromastore', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.__init__': ( 'vectorstore.html#chromastore.__init__',
+                                                                                 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.as_langchain': ( 'vectorstore.html#chromastore.as_langchain',
+                                                                                     'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.count': ('vectorstore.html#chromastore.count', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.delete': ( 'vectorstore.html#chromastore.delete',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.get': ('vectorstore.html#chromastore.get', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.query': ('vectorstore.html#chromastore.query', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.update': ( 'vectorstore.html#chromastore.update',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.ChromaStore.upsert': ( 'vectorstore.html#chromastore.upsert',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore': ('vectorstore.html#hnswstore', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore.__init__': ( 'vectorstore.html#hnswstore.__init__',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._add_to_index': ( 'vectorstore.html#hnswstore._add_to_index',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._delete_from_index': ( 'vectorstore.html#hnswstore._delete_from_index',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._open_index': ( 'vectorstore.html#hnswstore._open_index',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._resize_index': ( 'vectorstore.html#hnswstore._resize_index',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._save_index': ( 'vectorstore.html#hnswstore._save_index',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.HNSWStore._search': ('vectorstore.html#hnswstore._search', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase': ('vectorstore.html#localstorebase', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.__init__': ( 'vectorstore.html#localstorebase.__init__',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._add_to_index': ( 'vectorstore.html#localstorebase._add_to_index',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._delete_from_index': ( 'vectorstore.html#localstorebase._delete_from_index',
+                                                                                              'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._load': ( 'vectorstore.html#localstorebase._load',
+                                                                                 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._open_index': ( 'vectorstore.html#localstorebase._open_index',
+                                                                                       'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._open_matrix': ( 'vectorstore.html#localstorebase._open_matrix',
+                                                                                        'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._resize_index': ( 'vectorstore.html#localstorebase._resize_index',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._results': ( 'vectorstore.html#localstorebase._results',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._save_index': ( 'vectorstore.html#localstorebase._save_index',
+                                                                                       'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._search': ( 'vectorstore.html#localstorebase._search',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._set_info': ( 'vectorstore.html#localstorebase._set_info',
+                                                                                     'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._stored_rows': ( 'vectorstore.html#localstorebase._stored_rows',
+                                                                                        'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase._where': ( 'vectorstore.html#localstorebase._where',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.count': ( 'vectorstore.html#localstorebase.count',
+                                                                                 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.delete': ( 'vectorstore.html#localstorebase.delete',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.get': ( 'vectorstore.html#localstorebase.get',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.persist': ( 'vectorstore.html#localstorebase.persist',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.query': ( 'vectorstore.html#localstorebase.query',
+                                                                                 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.update': ( 'vectorstore.html#localstorebase.update',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.LocalStoreBase.upsert': ( 'vectorstore.html#localstorebase.upsert',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore': ('vectorstore.html#quantizedstore', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore.__init__': ( 'vectorstore.html#quantizedstore.__init__',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._add_to_index': ( 'vectorstore.html#quantizedstore._add_to_index',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._code_size': ( 'vectorstore.html#quantizedstore._code_size',
+                                                                                      'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._delete_from_index': ( 'vectorstore.html#quantizedstore._delete_from_index',
+                                                                                              'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._encode_rows': ( 'vectorstore.html#quantizedstore._encode_rows',
+                                                                                        'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._exact': ( 'vectorstore.html#quantizedstore._exact',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._num_subvectors': ( 'vectorstore.html#quantizedstore._num_subvectors',
+                                                                                           'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._open_index': ( 'vectorstore.html#quantizedstore._open_index',
+                                                                                       'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._pq_encode': ( 'vectorstore.html#quantizedstore._pq_encode',
+                                                                                      'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._resize_index': ( 'vectorstore.html#quantizedstore._resize_index',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._save_index': ( 'vectorstore.html#quantizedstore._save_index',
+                                                                                       'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._search': ( 'vectorstore.html#quantizedstore._search',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.QuantizedStore._train': ( 'vectorstore.html#quantizedstore._train',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB': ('vectorstore.html#vectordb', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.__init__': ('vectorstore.html#vectordb.__init__', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB._select_relevance_score_fn': ( 'vectorstore.html#vectordb._select_relevance_score_fn',
+                                                                                                'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.add_texts': ( 'vectorstore.html#vectordb.add_texts',
+                                                                               'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.delete': ('vectorstore.html#vectordb.delete', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.embeddings': ( 'vectorstore.html#vectordb.embeddings',
+                                                                                'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.from_texts': ( 'vectorstore.html#vectordb.from_texts',
+                                                                                'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.get': ('vectorstore.html#vectordb.get', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.similarity_search': ( 'vectorstore.html#vectordb.similarity_search',
+                                                                                       'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.similarity_search_by_vector': ( 'vectorstore.html#vectordb.similarity_search_by_vector',
+                                                                                                 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.similarity_search_by_vector_with_score': ( 'vectorstore.html#vectordb.similarity_search_by_vector_with_score',
+                                                                                                            'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorDB.similarity_search_with_score': ( 'vectorstore.html#vectordb.similarity_search_with_score',
+                                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase': ('vectorstore.html#vectorstorebase', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.as_langchain': ( 'vectorstore.html#vectorstorebase.as_langchain',
+                                                                                         'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.count': ( 'vectorstore.html#vectorstorebase.count',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.delete': ( 'vectorstore.html#vectorstorebase.delete',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.get': ( 'vectorstore.html#vectorstorebase.get',
+                                                                                'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.persist': ( 'vectorstore.html#vectorstorebase.persist',
+                                                                                    'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.query': ( 'vectorstore.html#vectorstorebase.query',
+                                                                                  'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.update': ( 'vectorstore.html#vectorstorebase.update',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.VectorStoreBase.upsert': ( 'vectorstore.html#vectorstorebase.upsert',
+                                                                                   'onprem/vectorstore.py'),
+                                    'onprem.vectorstore._kmeans': ('vectorstore.html#_kmeans', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore._nearest': ('vectorstore.html#_nearest', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore._normalize': ('vectorstore.html#_normalize', 'onprem/vectorstore.py'),
+                                    'onprem.vectorstore.get_store': ('vectorstore.html#get_store', 'onprem/vectorstore.py')},
             'onprem.webapp': {}}}
@@ -0,0 +1,572 @@
+"""caching functionality for `onprem`"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/06_cache.ipynb.
+
+# %% auto 0
+__all__ = ['RESPONSE_CACHE_NAME', 'EMBEDDING_CACHE_NAME', 'ANSWER_CACHE_NAME', 'LRUCache', 'hash_key', 'ResponseCache',
+           'normalize_text', 'open_memmap', 'EmbeddingCache', 'CachedEmbeddings', 'RetrievalCache',
+           'CachedQueryEmbeddings', 'AnswerCache']
+
+# %% ../nbs/06_cache.ipynb 3
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+
+from .utils import split_list
+
+# %% ../nbs/06_cache.ipynb 4
+class LRUCache:
+    def __init__(self, max_size:int=256):
+        """
+        A simple thread-safe in-memory cache that evicts the least-recently-used item
+        once more than `max_size` items are stored.
+        """
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key` (or `default` if missing)
+        """
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        """
+        Stores `value` for `key`, evicting the least-recently-used item if necessary
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes `key` and returns its value (or `default` if missing)
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        """
+        Removes all items
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+# %% ../nbs/06_cache.ipynb 5
+def hash_key(**kwargs):
+    """
+    Returns a SHA-256 hex digest of the supplied keyword arguments (which must be JSON-serializable).
+    """
+    data = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+RESPONSE_CACHE_NAME = 'response_cache.sqlite'
+
+class ResponseCache:
+    def __init__(self,
+                 path:str,
+                 max_entries:int=100000,
+                 ttl:Optional[float]=None,
+                 memory_size:int=1024):
+        """
+        Persistent cache of LLM responses stored in a SQLite database with an in-memory LRU front.
+
+        **Args:**
+
+        - *path*: Path to the SQLite database file (created if it doesn't exist)
+        - *max_entries*: Maximum number of responses stored on disk. Least-recently-used responses are evicted first.
+        - *ttl*: Time-to-live of a response in seconds. If None, responses never expire.
+        - *memory_size*: Number of responses also kept in memory
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory = LRUCache(memory_size)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS responses '
+                               '(key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                               'created REAL NOT NULL, accessed REAL NOT NULL)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self._count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def _expired(self, created:float):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key:str) -> Optional[str]:
+        """
+        Returns the cached response for `key` or None if there is no (unexpired) response.
+        """
+        entry = self.memory.get(key)
+        if entry is None:
+            with self._lock:
+                row = self._conn.execute('SELECT response, created FROM responses WHERE key = ?',
+                                         (key,)).fetchone()
+            entry = tuple(row) if row else None
+        if entry is not None and self._expired(entry[1]):
+            self.delete(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.memory.set(key, entry)
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+        return entry[0]
+
+    def set(self, key:str, response:str):
+        """
+        Stores `response` for `key`
+        """
+        now = time.time()
+        self.memory.set(key, (response, now))
+        with self._lock, self._conn:
+            cur = self._conn.execute('INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?)',
+                                     (key, response, now, now))
+            if cur.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute('UPDATE responses SET response = ?, created = ?, accessed = ? WHERE key = ?',
+                                   (response, now, now, key))
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """
+        Removes expired responses and then least-recently-used responses until
+        there are at most `max_entries` responses (caller must hold lock)
+        """
+        if self.ttl is not None:
+            self._conn.execute('DELETE FROM responses WHERE created < ?', (time.time() - self.ttl,))
+        self._count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            keys = [row[0] for row in self._conn.execute(
+                'SELECT key FROM responses ORDER BY accessed ASC LIMIT ?', (excess,))]
+            self._conn.executemany('DELETE FROM responses WHERE key = ?', [(k,) for k in keys])
+            for k in keys:
+                self.memory.pop(k)
+            self._count -= len(keys)
+
+    def delete(self, key:str):
+        """
+        Removes the response stored for `key`
+        """
+        self.memory.pop(key)
+        with self._lock, self._conn:
+            cur = self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._count -= cur.rowcount
+
+    def clear(self):
+        """
+        Removes all responses and resets hit/miss counters
+        """
+        self.memory.clear()
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM responses')
+            self._count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with keys: `hits`, `misses`, `size`
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+    def __len__(self):
+        return self._count
+
+# %% ../nbs/06_cache.ipynb 6
+EMBEDDING_CACHE_NAME = 'embedding_cache'
+
+def normalize_text(text:str):
+    """
+    Normalizes whitespace in `text` so that chunks differing only in whitespace share a cache entry
+    """
+    return ' '.join(text.split())
+
+
+def open_memmap(path:str, current:Optional[np.memmap], dtype, dim:int, capacity:Optional[int]=None):
+    """
+    Memory-maps the matrix with `dim` columns stored in `path`, growing the file to `capacity` rows if necessary
+    """
+    row_bytes = dim * np.dtype(dtype).itemsize
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if capacity is not None and capacity * row_bytes > size:
+        if current is not None:
+            current.flush()
+        with open(path, 'ab') as f:
+            f.truncate(capacity * row_bytes)
+        size = capacity * row_bytes
+    return np.memmap(path, dtype=dtype, mode='r+', shape=(size // row_bytes, dim))
+
+
+class EmbeddingCache:
+    def __init__(self, path:str, model_name:str, initial_capacity:int=1024):
+        """
+        Persistent cache of embeddings keyed by embedding model and text.
+        Embeddings are stored as rows of a memory-mapped float32 matrix and a SQLite index maps
+        each text's SHA-256 hash to its row. Each model gets its own subfolder of `path`.
+
+        **Args:**
+
+        - *path*: Path to folder storing cache (created if it doesn't exist)
+        - *model_name*: Name of embedding model (plus any settings that change its output)
+        - *initial_capacity*: Number of rows allocated when the matrix is first created. The matrix doubles in size when full.
+        """
+        self.model_name = model_name
+        self.path = os.path.join(path, hash_key(model_name=model_name)[:16])
+        os.makedirs(self.path, exist_ok=True)
+        self.initial_capacity = initial_capacity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix_path = os.path.join(self.path, 'embeddings.f32')
+        self._conn = sqlite3.connect(os.path.join(self.path, 'index.sqlite'), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._conn.execute('INSERT OR IGNORE INTO info VALUES (?, ?)', ('model_name', model_name))
+            self._count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+            row = self._conn.execute('SELECT value FROM info WHERE name = ?', ('dim',)).fetchone()
+        self.dim = int(row[0]) if row else None
+        self._matrix = None
+        if self.dim is not None:
+            self._open_matrix()
+
+    def _open_matrix(self, capacity:Optional[int]=None):
+        """
+        Memory-maps the embedding matrix, growing the file to `capacity` rows if necessary
+        """
+        self._matrix = open_memmap(self._matrix_path, self._matrix, np.float32, self.dim, capacity)
+
+    def _key(self, text:str):
+        return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+    def get(self, texts:List[str]):
+        """
+        Returns a list with the cached embedding (as a list of floats) of each text, or None where there is no cached embedding.
+        """
+        keys = [self._key(text) for text in texts]
+        rows = {}
+        with self._lock:
+            for lst in split_list(list(dict.fromkeys(keys)), 900):
+                rows.update(self._conn.execute(
+                    f'SELECT key, row FROM embeddings WHERE key IN ({",".join("?" * len(lst))})', lst).fetchall())
+            results = [self._matrix[rows[key]].tolist() if key in rows else None for key in keys]
+        hits = sum(r is not None for r in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def set(self, texts:List[str], embeddings:List[List[float]]):
+        """
+        Stores the embedding of each text
+        """
+        if not texts:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                with self._conn:
+                    self._conn.execute('INSERT OR REPLACE INTO info VALUES (?, ?)', ('dim', str(self.dim)))
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f'Expected embeddings of dimension {self.dim} but got {embeddings.shape[1]}.')
+            new = {}
+            for key, embedding in zip((self._key(text) for text in texts), embeddings):
+                new.setdefault(key, embedding)
+            existing = set()
+            for lst in split_list(list(new), 900):
+                existing.update(row[0] for row in self._conn.execute(
+                    f'SELECT key FROM embeddings WHERE key IN ({",".join("?" * len(lst))})', lst))
+            new = {key: embedding for key, embedding in new.items() if key not in existing}
+            if not new:
+                return
+            capacity = 0 if self._matrix is None else self._matrix.shape[0]
+            if self._count + len(new) > capacity:
+                self._open_matrix(max(self.initial_capacity, 2 * capacity, self._count + len(new)))
+            rows = range(self._count, self._count + len(new))
+            self._matrix[rows.start:rows.stop] = np.stack(list(new.values()))
+            self._matrix.flush()
+            with self._conn:
+                self._conn.executemany('INSERT INTO embeddings VALUES (?, ?)', zip(new, rows))
+            self._count += len(new)
+
+    def stats(self):
+        """
+        Returns a dictionary with keys: `hits`, `misses`, `hit_rate`, `size`
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0, 'size': len(self)}
+
+    def __len__(self):
+        return self._count
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings:Embeddings, cache:EmbeddingCache):
+        """
+        Wraps a LangChain `Embeddings` instance (e.g., `HuggingFaceEmbeddings`) so that
+        `embed_documents` only computes embeddings for texts missing from `cache`.
+        Identical texts within a batch are also only embedded once.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        results = self.cache.get(texts)
+        missing = {}
+        for i, (text, result) in enumerate(zip(texts, results)):
+            if result is None:
+                missing.setdefault(normalize_text(text), []).append(i)
+        if missing:
+            first = [texts[lst[0]] for lst in missing.values()]
+            computed = self.embeddings.embed_documents(first)
+            self.cache.set(first, computed)
+            for lst, embedding in zip(missing.values(), computed):
+                for i in lst:
+                    results[i] = list(embedding)
+        return results
+
+    def embed_query(self, text:str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+# %% ../nbs/06_cache.ipynb 7
+class RetrievalCache:
+    def __init__(self, max_size:int=1024):
+        """
+        In-memory cache of question embeddings and of the sources retrieved for questions, each holding
+        up to `max_size` least-recently-used entries. Questions are normalized with `normalize_text`.
+        Cached sources are tagged with the version of the vector database (see `onprem.ingest.Manifest.version`),
+        so they are no longer returned once the vector database changes.
+        """
+        self.embeddings = LRUCache(max_size)
+        self.results = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+
+    def get_embedding(self, question:str) -> Optional[List[float]]:
+        """
+        Returns the cached embedding of `question` (or None)
+        """
+        embedding = self.embeddings.get(normalize_text(question))
+        if embedding is None:
+            self.embedding_misses += 1
+        else:
+            self.embedding_hits += 1
+        return embedding
+
+    def set_embedding(self, question:str, embedding:List[float]):
+        """
+        Stores the embedding of `question`
+        """
+        self.embeddings.set(normalize_text(question), embedding)
+
+    def get(self, question:str, version:Any=None) -> Optional[list]:
+        """
+        Returns the cached sources retrieved for `question` from version `version` of the vector database (or None)
+        """
+        results = self.results.get((normalize_text(question), version))
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(results)
+
+    def set(self, question:str, results:list, version:Any=None):
+        """
+        Stores the sources retrieved for `question` from version `version` of the vector database
+        """
+        self.results.set((normalize_text(question), version), list(results))
+
+    def clear(self):
+        """
+        Removes all entries and resets counters
+        """
+        self.embeddings.clear()
+        self.results.clear()
+        self.hits = self.misses = self.embedding_hits = self.embedding_misses = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with keys: `hits`, `misses`, `embedding_hits`, `embedding_misses`, `size`
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'embedding_hits': self.embedding_hits,
+                'embedding_misses': self.embedding_misses, 'size': len(self.results)}
+
+
+class CachedQueryEmbeddings(Embeddings):
+    def __init__(self, embeddings:Embeddings, cache:RetrievalCache):
+        """
+        Wraps a LangChain `Embeddings` instance so that `embed_query` reuses embeddings of previous questions stored in `cache`
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text:str) -> List[float]:
+        embedding = self.cache.get_embedding(text)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(text)
+            self.cache.set_embedding(text, embedding)
+        return embedding
+
+# %% ../nbs/06_cache.ipynb 8
+ANSWER_CACHE_NAME = 'answer_cache.sqlite'
+
+class AnswerCache:
+    def __init__(self, path:str, max_entries:int=10000, threshold:float=0.9):
+        """
+        Persistent cache of answers to questions stored in a SQLite database.
+        A cached answer is returned for a new question if the new question retrieved the same sources
+        and its embedding has a cosine similarity of at least `threshold` with that of the answered question.
+
+        **Args:**
+
+        - *path*: Path to the SQLite database file (created if it doesn't exist)
+        - *max_entries*: Maximum number of answers stored. Least-recently-used answers are evicted first.
+        - *threshold*: Minimum cosine similarity between question embeddings for a cached answer to be returned
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS answers '
+                               '(id INTEGER PRIMARY KEY, scope TEXT NOT NULL, sources TEXT NOT NULL, version TEXT, '
+                               'question TEXT NOT NULL, embedding BLOB NOT NULL, answer TEXT NOT NULL, '
+                               'documents TEXT NOT NULL, accessed REAL NOT NULL)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS answers_sources ON answers (scope, sources)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS answers_accessed ON answers (accessed)')
+            self._count = self._conn.execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+
+    @staticmethod
+    def sources_key(documents:List[Document]):
+        """
+        Returns a key identifying the contents (text and metadata) of `documents`
+        """
+        return hash_key(sources=[hash_key(text=doc.page_content, metadata=doc.metadata) for doc in documents])
+
+    @staticmethod
+    def _normalize(embedding:List[float]):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _invalidate(self, version:Any):
+        """
+        Removes answers cached for a different `version` of the vector database (caller must hold lock)
+        """
+        if version is None:
+            return
+        cur = self._conn.execute('DELETE FROM answers WHERE version IS NOT ?', (str(version),))
+        self._count -= cur.rowcount
+
+    def get(self, embedding:List[float], documents:List[Document], scope:str='', version:Any=None) -> Optional[dict]:
+        """
+        Returns the cached answer for a question with embedding `embedding` that retrieved `documents` as a dictionary
+        with keys `question`, `answer`, `source_documents` (or None if there is no such answer).
+        Answers are only returned for the same `scope` (e.g., model and prompt) and `version` of the vector database.
+        Answers for other versions are removed.
+        """
+        embedding = self._normalize(embedding)
+        with self._lock, self._conn:
+            self._invalidate(version)
+            rows = self._conn.execute('SELECT id, question, embedding, answer, documents FROM answers '
+                                      'WHERE scope = ? AND sources = ?',
+                                      (scope, self.sources_key(documents))).fetchall()
+            best, best_score = None, self.threshold
+            for row in rows:
+                score = float(np.dot(np.frombuffer(row[2], dtype=np.float32), embedding))
+                if score >= best_score:
+                    best, best_score = row, score
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute('UPDATE answers SET accessed = ? WHERE id = ?', (time.time(), best[0]))
+        return {'question': best[1],
+                'answer': best[3],
+                'source_documents': [Document(**doc) for doc in json.loads(best[4])]}
+
+    def set(self, question:str, embedding:List[float], answer:str, documents:List[Document],
+            scope:str='', version:Any=None):
+        """
+        Stores `answer` to `question` (with embedding `embedding`), which retrieved `documents`
+        """
+        docs = json.dumps([{'page_content': doc.page_content, 'metadata': doc.metadata} for doc in documents],
+                          default=str)
+        with self._lock, self._conn:
+            self._invalidate(version)
+            self._conn.execute('INSERT INTO answers (scope, sources, version, question, embedding, answer, documents, accessed) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (scope, self.sources_key(documents), None if version is None else str(version),
+                                question, self._normalize(embedding).tobytes(), answer, docs, time.time()))
+            self._count += 1
+            excess = self._count - self.max_entries
+            if excess > 0:
+                cur = self._conn.execute('DELETE FROM answers WHERE id IN '
+                                         '(SELECT id FROM answers ORDER BY accessed ASC LIMIT ?)', (excess,))
+                self._count -= cur.rowcount
+
+    def clear(self):
+        """
+        Removes all answers and resets hit/miss counters
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM answers')
+            self._count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with keys: `hits`, `misses`, `size`
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+    def __len__(self):
+        return self._count
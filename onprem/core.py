@@ -11,6 +11,8 @@ __all__ = ['MIN_MODEL_SIZE', 'MISTRAL_MODEL_URL', 'MISTRAL_MODEL_ID', 'MISTRAL_P
 
 # %% ../nbs/00_core.ipynb 3
 from . import utils as U
+from .cache import LRUCache, ResponseCache, RetrievalCache, CachedQueryEmbeddings, AnswerCache, hash_key
+from .cache import RESPONSE_CACHE_NAME, ANSWER_CACHE_NAME
 from langchain.chains import RetrievalQA, ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
@@ -19,6 +21,11 @@ from langchain_community.llms import LlamaCpp
 from langchain_openai import ChatOpenAI, AzureChatOpenAI
 import os
 import warnings
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Optional, Callable, Union, List
 
 # %% ../nbs/00_core.ipynb 4
@@ -86,6 +93,29 @@ class LLM:
         check_model_download:bool=True,
         confirm: bool = True,
         verbose: bool = True,
+        max_concurrency: int = 8,
+        cache_responses: bool = False,
+        cache_sampled_responses: bool = False,
+        response_cache_kwargs: dict = {},
+        prefix_cache: bool = False,
+        prefix_cache_bytes: int = 2 << 30,
+        embedding_cache: bool = False,
+        embedding_workers: int = 0,
+        embedding_backend: str = 'torch',
+        vectordb_backend: str = 'chroma',
+        vectordb_kwargs: dict = {},
+        rag_retriever: str = 'dense',
+        rag_reranker: Optional[str] = None,
+        rag_rerank_candidates: int = 20,
+        rag_reranker_kwargs: dict = {},
+        rag_cache: bool = False,
+        rag_cache_size: int = 1024,
+        answer_cache: bool = False,
+        answer_cache_threshold: float = 0.9,
+        answer_cache_kwargs: dict = {},
+        rag_pack_context: bool = False,
+        rag_pack_kwargs: dict = {},
+        token_cache_size: int = 4096,
         **kwargs,
     ):
         """
@@ -122,6 +152,57 @@ class LLM:
         - *rag_score_threshold*: Minimum similarity score for source to be considered by `LLM.ask` and `LLM.chat`
         - *confirm*: whether or not to confirm with user before downloading a model
         - *verbose*: Verbosity
+        - *max_concurrency*: Maximum number of concurrent requests sent to the model by `LLM.prompt_batch` and
+                             the async methods (e.g., `LLM.aprompt`). Local models (llama.cpp, transformers)
+                             always run one generation at a time.
+        - *cache_responses*: If True, responses from `LLM.prompt` are cached on disk (in `model_download_path`)
+                             and reused for identical prompts. Only responses generated with a `temperature` of 0
+                             are cached unless `cache_sampled_responses=True`.
+        - *cache_sampled_responses*: If True, responses generated with a `temperature` above 0 are also cached.
+        - *response_cache_kwargs*: arguments to `onprem.cache.ResponseCache` (e.g., `{'max_entries': 10000, 'ttl': 86400}`).
+                                   Supply a `path` key to store the cache somewhere other than `model_download_path`.
+        - *prefix_cache*: If True, evaluated model states (i.e., KV caches) of llama.cpp models are kept in memory and
+                          restored for later prompts sharing the longest prefix, so only the rest of the prompt is evaluated.
+                          Useful when many prompts share a long template (e.g., `LLM.ask`, `Extractor.apply`).
+                          Only used with llama.cpp models.
+        - *prefix_cache_bytes*: Maximum memory used by the prefix cache. Least-recently-used states are evicted first.
+        - *embedding_cache*: If True, embeddings computed by `LLM.ingest` are cached on disk in `onprem_data/embedding_cache`,
+                             so identical chunks are only embedded once.
+        - *embedding_workers*: If greater than 1, `LLM.ingest` embeds chunks in this many worker processes
+                               (each loads its own copy of the embedding model).
+        - *embedding_backend*: One of {'torch', 'onnx'}. If 'onnx', embeddings for `LLM.ingest` and `LLM.ask` are computed
+                               with ONNX Runtime using an int8-quantized export of `embedding_model_name`.
+                               Only the `quantize`, `num_threads`, and `onnx_path` keys of `embedding_model_kwargs`
+                               are then used (see `onprem.ingest.OnnxEmbeddings`).
+        - *vectordb_backend*: One of {'chroma', 'hnsw', 'quantized'}. If 'hnsw', chunks are stored in an in-process HNSW index
+                              (see `onprem.vectorstore.HNSWStore`) instead of Chroma. If 'quantized', int8 or product-quantized
+                              embeddings are kept on disk for low-memory retrieval (see `onprem.vectorstore.QuantizedStore`).
+        - *vectordb_kwargs*: Extra arguments to the vector store (e.g., `{'quantization': 'pq', 'rescore': 8}`)
+        - *rag_retriever*: One of {'dense', 'hybrid'}. If 'hybrid', sources for `LLM.ask` and `LLM.chat` are retrieved with both
+                           vector search and BM25 keyword search (combined with reciprocal-rank fusion), which helps with
+                           questions about exact identifiers (e.g., part numbers). `LLM.ingest` then also builds a keyword index.
+        - *rag_reranker*: Name of a cross-encoder model (e.g., 'cross-encoder/ms-marco-MiniLM-L-6-v2'). If supplied,
+                          `rag_rerank_candidates` sources are retrieved and reranked with the cross-encoder, and only the best
+                          `rag_num_source_docs` sources are fed to `LLM.ask` and `LLM.chat` (see `onprem.retrieval.CrossEncoderReranker`).
+        - *rag_rerank_candidates*: Number of sources retrieved for reranking when `rag_reranker` is supplied
+        - *rag_reranker_kwargs*: Extra arguments to `onprem.retrieval.CrossEncoderReranker` (e.g., `{'backend': 'onnx'}`)
+        - *rag_cache*: If True, embeddings of questions and the sources retrieved for them are cached in memory,
+                       so repeated questions to `LLM.ask` and `LLM.chat` skip embedding and search. Cached sources are no longer used
+                       once the vector database changes. See `LLM.cache_stats`.
+        - *rag_cache_size*: Maximum number of questions in the cache when `rag_cache=True`
+        - *answer_cache*: If True, answers from `LLM.ask` are cached on disk (in `vectordb_path`) and returned
+                          without generation for later questions that are similar (see `answer_cache_threshold`)
+                          and retrieve the same sources. Cached answers are removed once the vector database changes.
+        - *answer_cache_threshold*: Minimum cosine similarity between the embeddings of a question and an answered question
+                                    for the cached answer to be returned
+        - *answer_cache_kwargs*: arguments to `onprem.cache.AnswerCache` (e.g., `{'max_entries': 1000}`).
+                                 Supply a `path` key to store the cache somewhere other than `vectordb_path`.
+        - *rag_pack_context*: If True, `LLM.ask` feeds the model only as many of the `rag_num_source_docs` sources
+                              (most relevant first) as fit in `n_ctx` along with the prompt and `max_tokens` generated tokens,
+                              as counted by `LLM.count_tokens`. Adjacent chunks from the same source are merged and
+                              the first source that does not fit is truncated. Set `rag_num_source_docs` to the most sources to consider.
+        - *rag_pack_kwargs*: Extra arguments to `onprem.retrieval.ContextPacker` (e.g., `{'trim': False}`)
+        - *token_cache_size*: Number of most recently tokenized texts whose tokens are kept in memory by `LLM.tokenize`
         """
         self.model_id = None
         self.model_url = None
@@ -179,9 +260,40 @@ class LLM:
         self.embedding_encode_kwargs = embedding_encode_kwargs
         self.rag_num_source_docs = rag_num_source_docs
         self.rag_score_threshold = rag_score_threshold
+        if rag_retriever not in ['dense', 'hybrid']:
+            raise ValueError("rag_retriever must be one of {'dense', 'hybrid'}")
+        self.rag_retriever = rag_retriever
+        self.rag_reranker = rag_reranker
+        self.rag_rerank_candidates = rag_rerank_candidates
+        self.rag_reranker_kwargs = rag_reranker_kwargs
+        self.reranker = None
+        self.rag_pack_context = rag_pack_context
+        self.rag_pack_kwargs = rag_pack_kwargs
+        self.rag_cache_size = rag_cache_size
+        self.retrieval_cache = RetrievalCache(rag_cache_size) if rag_cache else None
+        self.answer_cache = None
+        self.answer_cache_kwargs = {**answer_cache_kwargs, 'threshold': answer_cache_threshold} if answer_cache else None
         self.check_model_download = check_model_download
         self.verbose = verbose
+        self.max_concurrency = max_concurrency
         self.extra_kwargs = kwargs
+        self._semaphores = weakref.WeakKeyDictionary() # one semaphore per event loop
+        self._executor = None
+        self.response_cache = None
+        if cache_responses:
+            response_cache_kwargs = response_cache_kwargs.copy()
+            path = response_cache_kwargs.pop('path', os.path.join(self.model_download_path, RESPONSE_CACHE_NAME))
+            self.response_cache = ResponseCache(path, **response_cache_kwargs)
+        self.cache_sampled_responses = cache_sampled_responses
+        self.prefix_cache = prefix_cache
+        self.prefix_cache_bytes = prefix_cache_bytes
+        self.token_cache = LRUCache(token_cache_size)
+        self._vocab = None
+        self.embedding_cache = embedding_cache
+        self.embedding_workers = embedding_workers
+        self.embedding_backend = embedding_backend
+        self.vectordb_backend = vectordb_backend
+        self.vectordb_kwargs = vectordb_kwargs
 
 
         # explicitly set offload_kqv
@@ -278,7 +390,8 @@ class LLM:
     def load_ingester(self):
         """
         Get `Ingester` instance.
-        You can access the `langchain_chroma.Chroma` instance with `load_ingester().get_db()`.
+        You can access the `langchain_chroma.Chroma` instance (or `onprem.vectorstore.VectorDB` instance
+        if `vectordb_backend` is not 'chroma') with `load_ingester().get_db()`.
         """
         if not self.ingester:
             from onprem.ingest import Ingester
@@ -288,12 +401,18 @@ class LLM:
                 embedding_model_kwargs=self.embedding_model_kwargs,
                 embedding_encode_kwargs=self.embedding_encode_kwargs,
                 persist_directory=self.vectordb_path,
+                embedding_cache=self.embedding_cache,
+                embedding_workers=self.embedding_workers,
+                embedding_backend=self.embedding_backend,
+                vectordb_backend=self.vectordb_backend,
+                vectordb_kwargs=self.vectordb_kwargs,
+                sparse_index=self.rag_retriever == 'hybrid',
             )
         return self.ingester
 
     def load_vectordb(self):
         """
-        Get Chroma db instance
+        Get vector database instance (`langchain_chroma.Chroma` by default)
         """
         ingester = self.load_ingester()
         db = ingester.get_db()
@@ -309,17 +428,21 @@ class LLM:
         chunk_size: int = 500, # text is split to this many characters by `langchain.text_splitter.RecursiveCharacterTextSplitter`
         chunk_overlap: int = 50, # character overlap between chunks in `langchain.text_splitter.RecursiveCharacterTextSplitter`
         ignore_fn:Optional[Callable] = None, # callable that accepts the file path and returns True for ignored files
+        delete_missing:bool = False, # If True, previously-ingested files in `source_directory` that no longer exist are removed from vector database
+        stream:bool = False, # If True, documents are loaded, split, embedded, and stored concurrently with constant memory use
+        dedup:bool = False, # If True, duplicate and near-duplicate chunks are dropped
         **kwargs, # Extra kwargs fed to `load_single_document`
     ):
         """
         Ingests all documents in `source_folder` into vector database.
-        Previously-ingested documents are ignored.
+        Previously-ingested documents are ignored unless they have changed.
         Extra kwargs fed to `load_single_document`.
         """
         ingester = self.load_ingester()
         return ingester.ingest(
             source_directory,
             chunk_size=chunk_size, chunk_overlap=chunk_overlap, ignore_fn=ignore_fn,
+            delete_missing=delete_missing, stream=stream, dedup=dedup,
             **kwargs
         )
 
@@ -400,9 +523,112 @@ class LLM:
                 #offload_kqv = self.offload_kqv,
                 **self.extra_kwargs,
             )
+            if self.prefix_cache:
+                from llama_cpp import LlamaRAMCache
+                # llama.cpp restores the saved state with the longest prefix in common with the prompt
+                self.llm.client.set_cache(LlamaRAMCache(capacity_bytes=self.prefix_cache_bytes))
 
         return self.llm
 
+    def _tokenize(self, text:str) -> List[int]:
+        """
+        Tokenizes `text` with the model's tokenizer (without special tokens such as BOS)
+        """
+        if self.is_hf():
+            return self.load_llm().llm.pipeline.tokenizer.encode(text, add_special_tokens=False)
+        if self.is_llamacpp():
+            if self.llm is not None:
+                vocab = self.llm.client
+            else:
+                if self._vocab is None:
+                    from llama_cpp import Llama
+                    # only the vocabulary is loaded (not the weights) if the model has not been loaded yet
+                    self._vocab = Llama(model_path=self.check_model(), vocab_only=True, verbose=False)
+                vocab = self._vocab
+            return vocab.tokenize(text.encode('utf-8'), add_bos=False, special=True)
+        return self.load_llm().get_token_ids(text) # tiktoken
+
+    def tokenize(self, text:str) -> List[int]:
+        """
+        Returns the IDs of the tokens in `text` as produced by the model's tokenizer
+        (the llama.cpp vocabulary for GGUF models, the Hugging Face tokenizer for `model_id`,
+        and `tiktoken` for OpenAI and OpenAI-compatible APIs).
+        Tokens of the `token_cache_size` most recently tokenized texts are cached.
+        """
+        tokens = self.token_cache.get(text)
+        if tokens is None:
+            tokens = tuple(self._tokenize(text))
+            self.token_cache.set(text, tokens)
+        return list(tokens)
+
+    def count_tokens(self, text:str) -> int:
+        """
+        Returns the number of tokens in `text` (see `LLM.tokenize`)
+        """
+        return len(self.tokenize(text))
+
+
+    def _response_cache_key(self, prompt:str, prompt_template: Optional[str] = None, stop:list=[], **kwargs):
+        """
+        Returns the key used to look up the response to `prompt` in the response cache
+        or None if the response should not be cached.
+        """
+        if self.response_cache is None:
+            return None
+        llm = self.load_llm()
+        temperature = kwargs.get('temperature', self.extra_kwargs.get('temperature', getattr(llm, 'temperature', None)))
+        if temperature != 0 and not self.cache_sampled_responses:
+            return None
+        prompt_template = self.prompt_template if prompt_template is None else prompt_template
+        return hash_key(model_name=self.model_name,
+                        prompt_template=prompt_template,
+                        stop=stop if stop else self.stop,
+                        max_tokens=getattr(llm, 'max_tokens', self.max_tokens),
+                        extra_kwargs=self.extra_kwargs,
+                        kwargs=kwargs,
+                        prompt=prompt_template.format(**{"prompt": prompt}) if prompt_template else prompt)
+
+    def _cached_response(self, response:str):
+        """
+        Converts a cached response to the type returned by `LLM.prompt`
+        """
+        if self.is_local_api() or self.is_azure():
+            from langchain_core.messages import AIMessage
+            return AIMessage(content=response)
+        return response
+
+    def _format_prompt(self,
+                       prompt:str,
+                       image_path_or_url:Optional[str] = None,
+                       prompt_template: Optional[str] = None, stop:list=[]):
+        """
+        Applies the prompt template (and any image) to `prompt` and returns a tuple of the form
+        (model input, keyword arguments for model invocation).
+        """
+        from langchain_core.messages import HumanMessage
+        import base64
+        prompt_template = self.prompt_template if prompt_template is None else prompt_template
+        if prompt_template:
+            prompt = prompt_template.format(**{"prompt": prompt})
+        stop = stop if stop else self.stop
+        if image_path_or_url:
+            if not image_path_or_url.startswith('http'):
+                with open(image_path_or_url, "rb") as f:
+                    image_data = base64.b64encode(f.read()).decode('utf-8')
+                image_path_or_url = f"data:image/jpeg;base64,{image_data}"
+
+            message = HumanMessage(
+                content=[
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": image_path_or_url},
+                    },
+                ],
+            )
+            return [message], {} # including stop causes errors in gpt-4o
+        return prompt, {'stop': stop}
+
 
     def prompt(self,
                prompt:Union[str, List[Dict]],
@@ -425,41 +651,192 @@ class LLM:
                   This value will override the `stop` parameter supplied to `LLM` constructor.
 
         """
+        cache_key = None
         if isinstance(prompt, list): # list of dictionaries representing messages
             try:
                 res = self.llm.invoke(prompt, stop=stop, **kwargs)
             except Exception as e: # stop param fails with GPT-4o vision prompts
                 res = self.llm.invoke(prompt, **kwargs)
         else:
-            from langchain_core.messages import HumanMessage
-            import base64
+            if not image_path_or_url:
+                cache_key = self._response_cache_key(prompt, prompt_template=prompt_template, stop=stop, **kwargs)
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return self._cached_response(cached)
             llm = self.load_llm()
+            prompt, invoke_kwargs = self._format_prompt(prompt,
+                                                        image_path_or_url=image_path_or_url,
+                                                        prompt_template=prompt_template,
+                                                        stop=stop)
+            res = llm.invoke(prompt, **invoke_kwargs, **kwargs)
+        res = res.content if self.is_openai_model() or self.is_hf() else res
+        if cache_key:
+            self.response_cache.set(cache_key, res if isinstance(res, str) else res.content)
+        return res
+
+
+    def prompt_batch(self,
+                     prompts:List[str],
+                     prompt_template: Optional[str] = None,
+                     stop:list=[],
+                     batch_size:int=8,
+                     max_concurrency:Optional[int]=None,
+                     **kwargs):
+        """
+        Send many prompts to the LLM at once and return the responses in the same order as `prompts`.
+        Extra keyword arguments are sent directly to the model invocation.
+
+        - Models served through an API (e.g., vLLM, OpenAI) receive up to `max_concurrency` requests concurrently.
+        - Hugging Face `transformers` models generate `batch_size` left-padded prompts per call to `generate`.
+        - **llama.cpp** models are run one prompt at a time, as a loaded GGUF model cannot be shared
+          across concurrent generations. To run many GGUF prompts concurrently, serve the model with
+          an OpenAI-compatible server (e.g., llama.cpp server, vLLM) and supply its URL as `model_url`.
+
+        Construct the `LLM` with `mute_stream=True` (e.g., `LLM(..., mute_stream=True)`) when using this method,
+        as streamed tokens from concurrent generations are interleaved.
+
+        **Args:**
+
+        - *prompts*: A list of prompts (strings) to supply to the model.
+        - *prompt_template*: Optional prompt template (must have a variable named "prompt").
+                             This value will override any `prompt_template` value supplied
+                             to `LLM` constructor.
+        - *stop*: a list of strings to stop generation when encountered.
+                  This value will override the `stop` parameter supplied to `LLM` constructor.
+        - *batch_size*: Number of prompts padded into a single batch (Hugging Face `transformers` models only)
+        - *max_concurrency*: Maximum number of concurrent requests (API-based models only).
+                             If None, the `max_concurrency` value supplied to `LLM` constructor is used.
+
+        **Returns:**
+
+        - A list of responses in the same order as `prompts`
+        """
+        cache_keys = [self._response_cache_key(prompt, prompt_template=prompt_template, stop=stop, **kwargs)
+                      for prompt in prompts]
+        results = [self.response_cache.get(key) if key else None for key in cache_keys]
+        results = [self._cached_response(res) if res is not None else None for res in results]
+        todo = [i for i, res in enumerate(results) if res is None]
+        if todo:
             prompt_template = self.prompt_template if prompt_template is None else prompt_template
+            todo_prompts = [prompts[i] for i in todo]
             if prompt_template:
-                prompt = prompt_template.format(**{"prompt": prompt})
+                todo_prompts = [prompt_template.format(**{"prompt": prompt}) for prompt in todo_prompts]
             stop = stop if stop else self.stop
-            if image_path_or_url:
-                if not image_path_or_url.startswith('http'):
-                    with open(image_path_or_url, "rb") as f:
-                        image_data = base64.b64encode(f.read()).decode('utf-8')
-                    image_path_or_url = f"data:image/jpeg;base64,{image_data}"
-
-                message = HumanMessage(
-                    content=[
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": image_path_or_url},
-                        },
-                    ],
-                )
-                prompt = [message]
-                res = llm.invoke(prompt, **kwargs) # including stop causes errors in gpt-4o
-            else:
-                res = llm.invoke(prompt, stop=stop, **kwargs)
-        return res.content if self.is_openai_model() or self.is_hf() else res
+            responses = self._prompt_batch(todo_prompts, stop=stop, batch_size=batch_size,
+                                           max_concurrency=max_concurrency, **kwargs)
+            for i, res in zip(todo, responses):
+                results[i] = res
+                if cache_keys[i]:
+                    self.response_cache.set(cache_keys[i], res if isinstance(res, str) else res.content)
+        return results
+
+    def _prompt_batch(self, prompts:List[str], stop:list=[], batch_size:int=8,
+                      max_concurrency:Optional[int]=None, **kwargs):
+        """
+        Generates responses to already-formatted `prompts` (see `LLM.prompt_batch`)
+        """
+        llm = self.load_llm()
+        if self.is_hf():
+            pipe = llm.llm.pipeline
+            tokenizer = pipe.tokenizer
+            padding_side, pad_token_id = tokenizer.padding_side, tokenizer.pad_token_id
+            try:
+                # decoder-only models must be left-padded for batched generation
+                tokenizer.padding_side = 'left'
+                if tokenizer.pad_token_id is None:
+                    tokenizer.pad_token_id = tokenizer.eos_token_id
+                chat_prompts = [tokenizer.apply_chat_template([{'role': 'user', 'content': prompt}],
+                                                              tokenize=False, add_generation_prompt=True)
+                                for prompt in prompts]
+                # TextStreamer only supports a batch size of 1
+                outputs = pipe(chat_prompts, batch_size=batch_size, streamer=None,
+                               return_full_text=False, **kwargs)
+            finally:
+                tokenizer.padding_side, tokenizer.pad_token_id = padding_side, pad_token_id
+            # the pipeline has no stop strings, so responses are truncated at the first one
+            return [self._truncate_at_stop(output[0]['generated_text'], stop) for output in outputs]
+        elif self.is_openai_model() or self.is_azure() or self.is_local_api():
+            max_concurrency = self.max_concurrency if max_concurrency is None else max_concurrency
+            results = llm.batch(prompts, config={'max_concurrency': max_concurrency}, stop=stop, **kwargs)
+            return [res.content if self.is_openai_model() else res for res in results]
+        else:
+            return [llm.invoke(prompt, stop=stop, **kwargs) for prompt in prompts]
+
+
+    @staticmethod
+    def _truncate_at_stop(text:str, stop:list=[]):
+        """
+        Returns `text` up to the first occurrence of any string in `stop`
+        """
+        positions = [text.find(s) for s in stop if s and s in text]
+        return text[:min(positions)] if positions else text
+
+    def load_retriever(self):
+        """
+        Returns the retriever of sources for `LLM.ask` and `LLM.chat` (see `rag_retriever` and `rag_reranker` parameters)
+        """
+        db = self.load_vectordb()
+        ingester = self.load_ingester()
+        embeddings = ingester.get_embedding_model()
+        if self.retrieval_cache is not None or self.answer_cache_kwargs is not None:
+            # the answer cache looks up the embedding computed for retrieval (see `LLM._ask_cached`)
+            embeddings = CachedQueryEmbeddings(embeddings, self.retrieval_cache or RetrievalCache(self.rag_cache_size))
+            db = ingester.store.as_langchain(embeddings)
+        self._query_embeddings = embeddings
+        k = self.rag_rerank_candidates if self.rag_reranker else self.rag_num_source_docs
+        if self.rag_retriever == 'hybrid':
+            from onprem.retrieval import HybridRetriever
+
+            retriever = HybridRetriever(
+                store=ingester.store,
+                embeddings=embeddings,
+                sparse_index=ingester.get_sparse_index(),
+                k=k,
+                score_threshold=self.rag_score_threshold,
+            )
+        else:
+            retriever = db.as_retriever(
+                search_type="similarity_score_threshold",
+                search_kwargs={
+                    "k": k,
+                    "score_threshold": self.rag_score_threshold,
+                },
+            )
+        if self.rag_reranker:
+            from onprem.retrieval import CrossEncoderReranker, RerankingRetriever
+
+            if self.reranker is None:
+                self.reranker = CrossEncoderReranker(self.rag_reranker, **self.rag_reranker_kwargs)
+            retriever = RerankingRetriever(retriever=retriever, reranker=self.reranker, k=self.rag_num_source_docs)
+        if self.retrieval_cache is not None:
+            from onprem.retrieval import CachedRetriever
 
+            retriever = CachedRetriever(retriever=retriever, cache=self.retrieval_cache,
+                                        version=lambda: ingester.manifest.version)
+        return retriever
 
+    def load_answer_cache(self):
+        """
+        Returns the `onprem.cache.AnswerCache` used by `LLM.ask` (or None if `answer_cache=False`)
+        """
+        if self.answer_cache is None and self.answer_cache_kwargs is not None:
+            kwargs = self.answer_cache_kwargs.copy()
+            path = kwargs.pop('path', os.path.join(self.load_ingester().persist_directory, ANSWER_CACHE_NAME))
+            self.answer_cache = AnswerCache(path, **kwargs)
+        return self.answer_cache
+
+    def cache_stats(self):
+        """
+        Returns hit and miss counters of the response cache (`cache_responses=True`), retrieval cache (`rag_cache=True`)
+        and answer cache (`answer_cache=True`) as a dictionary with keys `responses`, `retrieval` and `answers`
+        (None if the cache is not enabled)
+        """
+        return {
+            'responses': self.response_cache.stats() if self.response_cache is not None else None,
+            'retrieval': self.retrieval_cache.stats() if self.retrieval_cache is not None else None,
+            'answers': self.load_answer_cache().stats() if self.answer_cache_kwargs is not None else None,
+        }
 
     def load_qa(self, prompt_template: str = DEFAULT_QA_PROMPT):
         """
@@ -470,15 +847,17 @@ class LLM:
         - *prompt_template*: A string representing the prompt with variables "context" and "question"
         """
         if self.qa is None:
-            db = self.load_vectordb()
-            retriever = db.as_retriever(
-                search_type="similarity_score_threshold",
-                search_kwargs={
-                    "k": self.rag_num_source_docs,
-                    "score_threshold": self.rag_score_threshold,
-                },
-            )
+            retriever = self.load_retriever()
             llm = self.load_llm()
+            if self.rag_pack_context:
+                from onprem.retrieval import ContextPacker, PackingRetriever
+
+                retriever = PackingRetriever(
+                    retriever=retriever,
+                    packer=ContextPacker(self.count_tokens, **self.rag_pack_kwargs),
+                    prompt_template=prompt_template,
+                    max_prompt_tokens=lambda: self.n_ctx - getattr(llm, 'max_tokens', self.max_tokens),
+                )
             PROMPT = PromptTemplate(
                 template=prompt_template, input_variables=["context", "question"]
             )
@@ -496,14 +875,7 @@ class LLM:
         Prepares and loads a `langchain.chains.ConversationalRetrievalChain` instance
         """
         if self.chatqa is None:
-            db = self.load_vectordb()
-            retriever = db.as_retriever(
-                search_type="similarity_score_threshold",  # see note in constructor
-                search_kwargs={
-                    "k": self.rag_num_source_docs,
-                    "score_threshold": self.rag_score_threshold,
-                },
-            )
+            retriever = self.load_retriever()
             llm = self.load_llm()
             memory = AnswerConversationBufferMemory(
                 memory_key="chat_history", return_messages=True
@@ -533,6 +905,8 @@ class LLM:
         prompt_template = self.prompt_template if prompt_template is None else prompt_template
         prompt_template = qa_template if prompt_template is None else prompt_template.format(**{'prompt': qa_template})
         qa = self.load_qa(prompt_template=prompt_template)
+        if self.answer_cache_kwargs is not None:
+            return self._ask_cached(qa, question, prompt_template, **kwargs)
         res = qa.invoke(question, **kwargs)
         res["question"] = res["query"]
         del res["query"]
@@ -540,6 +914,32 @@ class LLM:
         del res["result"]
         return res
 
+    def _ask_cached(self, qa:RetrievalQA, question:str, prompt_template:str, **kwargs):
+        """
+        Answers `question` with `qa` (like `LLM.ask`), reusing answers from the answer cache.
+        Sources are retrieved only once and are only fed to the model if there is no cached answer.
+        The question is embedded only once, as the embedding computed for retrieval is cached.
+        """
+        llm = self.load_llm()
+        version = self.load_ingester().manifest.version
+        documents = qa.retriever.invoke(question)
+        embedding = self._query_embeddings.embed_query(question)
+        scope = hash_key(model_name=self.model_name,
+                         prompt_template=prompt_template,
+                         stop=self.stop,
+                         max_tokens=getattr(llm, 'max_tokens', self.max_tokens),
+                         extra_kwargs=self.extra_kwargs,
+                         kwargs=kwargs)
+        answer_cache = self.load_answer_cache()
+        cached = answer_cache.get(embedding, documents, scope=scope, version=version)
+        if cached is not None:
+            answer = cached['answer']
+        else:
+            answer = qa.combine_documents_chain.invoke({'input_documents': documents, 'question': question},
+                                                       **kwargs)['output_text']
+            answer_cache.set(question, embedding, answer, documents, scope=scope, version=version)
+        return {'source_documents': documents, 'question': question, 'answer': answer}
+
     def chat(self, question: str, **kwargs):
         """
         Chat with documents fed to the `ingest` method.
@@ -557,3 +957,144 @@ class LLM:
         chatqa = self.load_chatqa()
         res = chatqa.invoke(question, **kwargs)
         return res
+
+    def _get_semaphore(self):
+        """
+        Returns the `asyncio.Semaphore` bounding concurrent requests for the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def _arun(self, fn:Callable, *args, **kwargs):
+        """
+        Runs `fn` in the dedicated single-thread executor used for local models,
+        so that a loaded model is never entered concurrently.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='onprem-llm')
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def aprompt(self,
+                      prompt:Union[str, List[Dict]],
+                      image_path_or_url:Optional[str] = None,
+                      prompt_template: Optional[str] = None, stop:list=[], **kwargs):
+        """
+        Async version of `LLM.prompt`.
+        At most `max_concurrency` requests are sent to the model at once.
+        Local models (llama.cpp, transformers) are run in a dedicated executor one request at a time.
+        """
+        async with self._get_semaphore():
+            if self.is_local():
+                return await self._arun(self.prompt, prompt,
+                                        image_path_or_url=image_path_or_url,
+                                        prompt_template=prompt_template,
+                                        stop=stop, **kwargs)
+            llm = self.load_llm()
+            if isinstance(prompt, list): # list of dictionaries representing messages
+                try:
+                    res = await llm.ainvoke(prompt, stop=stop, **kwargs)
+                except Exception as e: # stop param fails with GPT-4o vision prompts
+                    res = await llm.ainvoke(prompt, **kwargs)
+                return res.content if self.is_openai_model() else res
+            cache_key = None
+            if not image_path_or_url:
+                cache_key = self._response_cache_key(prompt, prompt_template=prompt_template, stop=stop, **kwargs)
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return self._cached_response(cached)
+            prompt, invoke_kwargs = self._format_prompt(prompt,
+                                                        image_path_or_url=image_path_or_url,
+                                                        prompt_template=prompt_template,
+                                                        stop=stop)
+            res = await llm.ainvoke(prompt, **invoke_kwargs, **kwargs)
+        res = res.content if self.is_openai_model() else res
+        if cache_key:
+            self.response_cache.set(cache_key, res if isinstance(res, str) else res.content)
+        return res
+
+    async def astream(self, prompt:str, prompt_template: Optional[str] = None, stop:list=[], **kwargs):
+        """
+        Async generator that yields the response to `prompt` as it is generated (as strings).
+        Arguments are the same as `LLM.prompt`.
+        Local models (llama.cpp, transformers) are run in a dedicated executor one request at a time
+        (i.e., the whole stream is generated before another request is started).
+        """
+        llm = self.load_llm()
+        prompt, invoke_kwargs = self._format_prompt(prompt, prompt_template=prompt_template, stop=stop)
+        async with self._get_semaphore():
+            if self.is_local():
+                loop = asyncio.get_running_loop()
+                queue = asyncio.Queue()
+                done = object()
+                closed = threading.Event()
+
+                def generate():
+                    # runs as a single job in the executor, so no other request enters the model mid-stream
+                    try:
+                        for chunk in llm.stream(prompt, **invoke_kwargs, **kwargs):
+                            if closed.is_set():
+                                break
+                            loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                    finally:
+                        loop.call_soon_threadsafe(queue.put_nowait, done)
+
+                job = asyncio.ensure_future(self._arun(generate))
+                finished = False
+                try:
+                    while (chunk := await queue.get()) is not done:
+                        yield chunk if isinstance(chunk, str) else chunk.content
+                    finished = True
+                finally:
+                    closed.set()
+                    # wait for generation to stop (even if the stream was closed early) before returning
+                    try:
+                        await job
+                    except Exception as e:
+                        if finished:
+                            raise
+                        warnings.warn(f'Generation failed after the stream was closed: {e}')
+            else:
+                async for chunk in llm.astream(prompt, **invoke_kwargs, **kwargs):
+                    yield chunk if isinstance(chunk, str) else chunk.content
+
+    async def aask(self, question: str, qa_template=DEFAULT_QA_PROMPT, prompt_template=None, **kwargs):
+        """
+        Async version of `LLM.ask`.
+        Local models (llama.cpp, transformers) are run in a dedicated executor one request at a time.
+        """
+        if self.is_local():
+            async with self._get_semaphore():
+                return await self._arun(self.ask, question, qa_template=qa_template,
+                                        prompt_template=prompt_template, **kwargs)
+        if self.answer_cache_kwargs is not None:
+            async with self._get_semaphore():
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, functools.partial(self.ask, question, qa_template=qa_template,
+                                                                          prompt_template=prompt_template, **kwargs))
+        prompt_template = self.prompt_template if prompt_template is None else prompt_template
+        prompt_template = qa_template if prompt_template is None else prompt_template.format(**{'prompt': qa_template})
+        qa = self.load_qa(prompt_template=prompt_template)
+        async with self._get_semaphore():
+            res = await qa.ainvoke(question, **kwargs)
+        res["question"] = res["query"]
+        del res["query"]
+        res["answer"] = res["result"]
+        del res["result"]
+        return res
+
+    async def achat(self, question: str, **kwargs):
+        """
+        Async version of `LLM.chat`.
+        Local models (llama.cpp, transformers) are run in a dedicated executor one request at a time.
+        """
+        if self.is_local():
+            async with self._get_semaphore():
+                return await self._arun(self.chat, question, **kwargs)
+        chatqa = self.load_chatqa()
+        async with self._get_semaphore():
+            res = await chatqa.ainvoke(question, **kwargs)
+        return res
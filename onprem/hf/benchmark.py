@@ -0,0 +1,309 @@
+"""Benchmark module"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/05_hf.benchmark.ipynb.
+
+# %% auto 0
+__all__ = ['BACKENDS', 'Benchmark', 'main']
+
+# %% ../../nbs/05_hf.benchmark.ipynb 3
+"""
+Benchmark module
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import multiprocessing
+
+from argparse import ArgumentParser
+
+import numpy as np
+import torch
+
+from transformers import AutoTokenizer
+
+from .models.pooling.factory import PoolingFactory
+
+try:
+    import resource
+
+    RESOURCE = True
+except ImportError:
+    # Not available on Windows
+    RESOURCE = False
+
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+
+class Benchmark:
+    """
+    Measures the throughput, latency and memory use of pooling models (`Pooling`, `MeanPooling`, `ClsPooling`)
+    run with PyTorch or ONNX Runtime (via `OnnxModel`) on synthetic data.
+    """
+
+    def __init__(self, path, size=256, seed=42):
+        """
+        Creates a new Benchmark.
+
+        Args:
+            path: path to model, accepts Hugging Face model hub id or local path (use a locally cached model to run offline)
+            size: number of sentences encoded for each configuration
+            seed: random seed used to generate sentences
+        """
+
+        self.path = path
+        self.size = size
+        self.seed = seed
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+
+    def __call__(self, backends=None, batchsizes=(1, 8, 32), seqlengths=(16, 128), threads=(1,)):
+        """
+        Runs the benchmark. Each configuration is run in a separate process so that peak memory use is measured per configuration.
+
+        Args:
+            backends: list of backends to run (torch, onnx, onnx-int8), defaults to all backends
+            batchsizes: list of batch sizes
+            seqlengths: list of sequence lengths (in tokens)
+            threads: list of thread counts
+
+        Returns:
+            dict with benchmark environment and list of results, one per configuration
+        """
+
+        backends = backends if backends else BACKENDS
+        for backend in backends:
+            if backend not in BACKENDS:
+                raise ValueError(f"backend must be one of {BACKENDS}, but got '{backend}'")
+
+        results = []
+
+        # Each task runs in a new process
+        context = multiprocessing.get_context("spawn")
+        with tempfile.TemporaryDirectory() as tmpdir, context.Pool(1, maxtasksperchild=1) as pool:
+            for backend in backends:
+                path = pool.apply(self.export, (backend, tmpdir))
+                for count in threads:
+                    for seqlength in seqlengths:
+                        for batchsize in batchsizes:
+                            results.append(pool.apply(self.run, (backend, path, count, seqlength, batchsize)))
+
+        return {"model": self.path, "size": self.size, "environment": self.environment(), "results": results}
+
+    def run(self, backend, path, count, seqlength, batchsize):
+        """
+        Runs a single configuration in the current process.
+
+        Args:
+            backend: backend name (torch, onnx, onnx-int8)
+            path: model path returned by export
+            count: number of threads
+            seqlength: sequence length (in tokens)
+            batchsize: batch size
+
+        Returns:
+            dict with configuration and results
+        """
+
+        model = self.model(path)
+        self.threads(model, backend, count)
+        data = self.data(seqlength)
+        return dict(backend=backend, threads=count, batchsize=batchsize, seqlength=seqlength, **self.measure(model, data, batchsize))
+
+    def export(self, backend, tmpdir):
+        """
+        Exports the model for backend. ONNX models are exported to tmpdir.
+
+        Args:
+            backend: backend name (torch, onnx, onnx-int8)
+            tmpdir: temporary directory for exported models
+
+        Returns:
+            model path
+        """
+
+        if backend.startswith("onnx"):
+            # pylint: disable=C0415
+            from onprem.hf.train.hfonnx import HFOnnx
+
+            return HFOnnx()(self.path, task="pooling", output=os.path.join(tmpdir, f"{backend}.onnx"), quantize=backend == "onnx-int8")
+
+        return self.path
+
+    def model(self, path):
+        """
+        Loads a pooling model.
+
+        Args:
+            path: model path returned by export
+
+        Returns:
+            Pooling
+        """
+
+        model = PoolingFactory.create({"path": path, "tokenizer": self.path, "device": -1, "maxlength": True})
+
+        # Store model path to recreate ONNX sessions with different thread counts
+        model.path = path
+        return model
+
+    def threads(self, model, backend, count):
+        """
+        Sets the number of threads used by model.
+
+        Args:
+            model: Pooling model
+            backend: backend name
+            count: number of threads
+        """
+
+        torch.set_num_threads(count)
+
+        if backend.startswith("onnx"):
+            # pylint: disable=C0415
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = count
+            model.model.model = ort.InferenceSession(model.path, options, model.model.providers())
+
+    def data(self, seqlength):
+        """
+        Generates synthetic sentences of random words from the tokenizer vocabulary. Each sentence is about seqlength tokens.
+
+        Args:
+            seqlength: sequence length (in tokens)
+
+        Returns:
+            list of sentences
+        """
+
+        words = sorted(x for x in self.tokenizer.get_vocab() if x.isalpha() and x.islower() and len(x) > 1)
+        random = np.random.RandomState(self.seed)
+        return [" ".join(random.choice(words, seqlength)) for _ in range(self.size)]
+
+    def measure(self, model, data, batchsize):
+        """
+        Encodes data with model and measures performance.
+
+        Args:
+            model: Pooling model
+            data: list of sentences
+            batchsize: batch size
+
+        Returns:
+            dict with tokens, sentences/sec, p50/p99 latency per batch (ms) and peak RSS of the process (MB)
+        """
+
+        # Warm up
+        model.encode(data[:batchsize], batch=batchsize)
+
+        latencies = []
+        start = time.perf_counter()
+        for x in range(0, len(data), batchsize):
+            batch = data[x : x + batchsize]
+            begin = time.perf_counter()
+            model.encode(batch, batch=batchsize)
+            latencies.append((time.perf_counter() - begin) * 1000)
+        elapsed = time.perf_counter() - start
+
+        tokens = np.mean([len(x) for x in self.tokenizer(data[:32], truncation=True, max_length=model.maxlength)["input_ids"]])
+
+        return {
+            "tokens": float(tokens),
+            "sentences": len(data),
+            "seconds": elapsed,
+            "sentences_per_second": len(data) / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "peak_rss_mb": self.peakrss(),
+        }
+
+    def peakrss(self):
+        """
+        Reads the peak resident set size (RSS) of the current process.
+
+        Returns:
+            peak RSS (MB) or None if it can't be measured
+        """
+
+        if RESOURCE:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            # ru_maxrss is in bytes on macOS and kilobytes on Linux
+            return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+        try:
+            # pylint: disable=C0415
+            import psutil
+
+            info = psutil.Process().memory_info()
+
+            # Peak working set on Windows
+            return getattr(info, "peak_wset", info.rss) / 1024**2
+        except ImportError:
+            return None
+
+    def environment(self):
+        """
+        Describes the environment the benchmark ran in.
+
+        Returns:
+            dict with versions and hardware information
+        """
+
+        # pylint: disable=C0415
+        from onprem import __version__
+
+        try:
+            import onnxruntime
+
+            ortversion = onnxruntime.__version__
+        except ImportError:
+            ortversion = None
+
+        return {
+            "onprem": __version__,
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "onnxruntime": ortversion,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+        }
+
+
+def main(args=None):
+    """
+    Runs the benchmark from the command line and writes JSON results.
+
+    Args:
+        args: list of command line arguments, defaults to sys.argv
+    """
+
+    parser = ArgumentParser(description="Benchmarks embedding throughput of pooling models. Example: python -m onprem.hf.benchmark --model sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--model", required=True, help="path to model, accepts Hugging Face model hub id or local path")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated list of backends; default is all backends")
+    parser.add_argument("--batchsizes", default="1,8,32", help="comma-separated list of batch sizes")
+    parser.add_argument("--seqlengths", default="16,128", help="comma-separated list of sequence lengths (in tokens)")
+    parser.add_argument("--threads", default="1", help="comma-separated list of thread counts")
+    parser.add_argument("--size", type=int, default=256, help="number of sentences encoded for each configuration")
+    parser.add_argument("--output", help="path to JSON output file; default prints to stdout")
+    args = parser.parse_args(args)
+
+    ints = lambda x: [int(y) for y in x.split(",")]
+    results = Benchmark(args.model, size=args.size)(args.backends.split(","), ints(args.batchsizes), ints(args.seqlengths), ints(args.threads))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+# %% ../../nbs/05_hf.benchmark.ipynb 4
+if __name__ == "__main__":
+    main()
@@ -4,22 +4,42 @@
 
 # %% auto 0
 __all__ = ['logger', 'DEFAULT_CHUNK_SIZE', 'DEFAULT_CHUNK_OVERLAP', 'COLLECTION_NAME', 'CHROMA_MAX', 'PDFOCR', 'PDFMD', 'PDF',
-           'PDF_EXTS', 'OCR_CHAR_THRESH', 'LOADER_MAPPING', 'DEFAULT_DB', 'MyElmLoader', 'MyUnstructuredPDFLoader',
-           'PDF2MarkdownLoader', 'extract_files', 'load_single_document', 'load_documents', 'process_documents',
-           'does_vectorstore_exist', 'batchify_chunks', 'Ingester']
+           'PDF_EXTS', 'OCR_CHAR_THRESH', 'LOADER_MAPPING', 'MANIFEST_NAME', 'ONNX_MODELS', 'DEFAULT_DB', 'MyElmLoader',
+           'MyUnstructuredPDFLoader', 'PDF2MarkdownLoader', 'extract_files', 'load_single_document', 'load_documents',
+           'iter_documents', 'get_text_splitter', 'Deduplicator', 'process_documents', 'does_vectorstore_exist',
+           'iter_chunk_metadata', 'batchify_chunks', 'source_id', 'chunk_id', 'chunk_ids', 'file_hash', 'Manifest',
+           'OnnxEmbeddings', 'get_embeddings', 'EmbeddingEngine', 'Ingester']
 
 # %% ../nbs/01_ingest.ipynb 3
 from .utils import get_datadir
+from .cache import EmbeddingCache, CachedEmbeddings, EMBEDDING_CACHE_NAME, hash_key, LRUCache
+from .vectorstore import get_store, VectorDB, CHROMA_COLLECTION
+from .retrieval import BM25Index, BM25_NAME
 import os
 import os.path
+import re
+import zlib
+import numpy as np
 import glob
-from typing import List, Optional, Callable
+import itertools
+from typing import List, Optional, Callable, Iterable, Union
 from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 import functools
 from tqdm import tqdm
 import warnings
+import hashlib
+import json
+import sqlite3
+import queue
+import threading
+import time
+import multiprocessing
+import weakref
+from collections import deque
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     CSVLoader,
@@ -35,10 +55,7 @@ from langchain_community.document_loaders import (
     UnstructuredPowerPointLoader,
     UnstructuredWordDocumentLoader,
 )
-from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
-import chromadb
-from chromadb.config import Settings
 from . import utils as U
 
 import logging
@@ -49,7 +66,7 @@ logger = logging.getLogger('OnPrem.LLM-ingest')
 
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_CHUNK_OVERLAP = 50
-COLLECTION_NAME = "onprem_chroma"
+COLLECTION_NAME = CHROMA_COLLECTION
 CHROMA_MAX = 41000
 
 # %% ../nbs/01_ingest.ipynb 4
@@ -199,22 +216,54 @@ def load_single_document(file_path: str, # path to file
         logger.warning(f"\nSkipping {file_path} due to unsupported file extension: '{ext}'")
 
 
+def _is_ignored(file_path:str, ignored_files:set):
+    """
+    Returns True if `file_path` or any of its parent folders (supplied with a trailing path separator) is in `ignored_files`
+    """
+    if file_path in ignored_files:
+        return True
+    folder = os.path.dirname(file_path)
+    while True:
+        if folder.rstrip(os.sep) + os.sep in ignored_files:
+            return True
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return False
+        folder = parent
+
+
+def _queue_files(source_dir:str,
+                 ignored_files:Optional[Iterable[str]] = None,
+                 ignore_fn:Optional[Callable] = None,
+                 file_paths:Optional[List[str]] = None) -> List[str]:
+    """
+    Returns the files to load from `source_dir` (or `file_paths`), skipping Office lock files and
+    files excluded by `ignored_files` or `ignore_fn` (see `load_documents`)
+    """
+    all_files = extract_files(source_dir) if file_paths is None else file_paths
+    ignored_files = ignored_files if isinstance(ignored_files, (set, frozenset)) else set(ignored_files or [])
+    filtered_files = [
+        file_path for file_path in all_files if not os.path.basename(file_path).startswith('~$')
+         and not (ignored_files and _is_ignored(file_path, ignored_files))
+         and (ignore_fn is None or not ignore_fn(file_path))
+    ]
+    print(f"Queued {len(filtered_files)} files for loading ({len(all_files) - len(filtered_files)} skipped)")
+    return filtered_files
+
+
 def load_documents(source_dir: str, # path to folder containing documents
-                   ignored_files: List[str] = [], # list of filepaths to ignore
+                   ignored_files: Optional[Iterable[str]] = None, # filepaths to ignore. Folders ending with a path separator ignore all files beneath them.
                    ignore_fn:Optional[Callable] = None, # callable that accepts file path and returns True for ignored files
                    pdf_unstructured:bool=False, # If True, use unstructured for PDF extraction
+                   file_paths:Optional[List[str]] = None, # files to load. If None, all supported files in `source_dir` are loaded.
                    **kwargs
 ) -> List[Document]:
     """
     Loads all documents from the source documents directory, ignoring specified files.
     Extra kwargs fed to `ingest.load_single_document`.
     """
-    all_files = extract_files(source_dir)
+    filtered_files = _queue_files(source_dir, ignored_files=ignored_files, ignore_fn=ignore_fn, file_paths=file_paths)
 
-    filtered_files = [
-        file_path for file_path in all_files if file_path not in ignored_files and not os.path.basename(file_path).startswith('~$')
-         and (ignore_fn is None or not ignore_fn(file_path))
-    ]
 
     with Pool(processes=os.cpu_count()) as pool:
         results = []
@@ -233,25 +282,179 @@ def load_documents(source_dir: str, # path to folder containing documents
     return results
 
 
+def iter_documents(source_dir: str, # path to folder containing documents
+                   ignored_files: Optional[Iterable[str]] = None, # filepaths to ignore. Folders ending with a path separator ignore all files beneath them.
+                   ignore_fn:Optional[Callable] = None, # callable that accepts file path and returns True for ignored files
+                   pdf_unstructured:bool=False, # If True, use unstructured for PDF extraction
+                   file_paths:Optional[List[str]] = None, # files to load. If None, all supported files in `source_dir` are loaded.
+                   max_pending:Optional[int] = None, # maximum number of files loaded ahead of the consumer (default: twice the number of CPUs)
+                   **kwargs
+):
+    """
+    Like `load_documents`, but yields the documents of each file as soon as the file is loaded.
+    At most `max_pending` files are loaded ahead of the consumer, so memory use does not grow with the number of files.
+    Extra kwargs fed to `ingest.load_single_document`.
+    """
+    filtered_files = _queue_files(source_dir, ignored_files=ignored_files, ignore_fn=ignore_fn, file_paths=file_paths)
+    max_pending = max_pending or 2 * os.cpu_count()
+    load_fn = functools.partial(load_single_document, pdf_unstructured=pdf_unstructured, **kwargs)
+    files = iter(filtered_files)
+    with Pool(processes=os.cpu_count()) as pool:
+        pending = deque(pool.apply_async(load_fn, (file_path,)) for file_path in itertools.islice(files, max_pending))
+        with tqdm(
+            total=len(filtered_files), desc="Loading new documents", ncols=80
+        ) as pbar:
+            while pending:
+                docs = pending.popleft().get()
+                for file_path in itertools.islice(files, 1):
+                    pending.append(pool.apply_async(load_fn, (file_path,)))
+                pbar.update()
+                if docs:
+                    yield docs
+
+
+def get_text_splitter(chunk_size:int=DEFAULT_CHUNK_SIZE, chunk_overlap:int=DEFAULT_CHUNK_OVERLAP, is_markdown:bool=False):
+    """
+    Returns the text splitter used to split documents into chunks
+    """
+    if is_markdown:
+        from langchain_text_splitters.base import Language
+
+        return RecursiveCharacterTextSplitter.from_language(
+            language=Language.MARKDOWN,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+
+
+class Deduplicator:
+    def __init__(self,
+                 threshold:Optional[float]=0.8,
+                 num_perm:int=64,
+                 shingle_size:int=5,
+                 max_entries:int=1000000,
+                 seed:int=42):
+        """
+        Drops duplicate chunks as they are ingested. Exact duplicates are detected by hashing
+        (whitespace-normalized) chunk text. Near-duplicates are detected with MinHash signatures over
+        word shingles and locality-sensitive hashing (LSH). The sources of dropped chunks are recorded
+        in the `duplicate_sources` metadata (a JSON list) of the chunk that is kept.
+        Only the `max_entries` most-recently-seen chunks are remembered, so memory use is bounded.
+
+        **Args:**
+
+        - *threshold*: Estimated Jaccard similarity of shingles at or above which chunks are near-duplicates.
+                       If None, only exact duplicates are dropped.
+        - *num_perm*: Number of hash functions in MinHash signatures
+        - *shingle_size*: Number of words in each shingle
+        - *max_entries*: Maximum number of chunks remembered
+        - *seed*: Random seed for MinHash hash functions
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.hashes = LRUCache(max_entries)
+        self.buckets = LRUCache(max_entries)
+        self.updated = {}
+        self.sources = set()
+        self._lock = threading.Lock()
+        self.num_exact = 0
+        self.num_near = 0
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2**32, size=num_perm, dtype=np.uint64)
+        if threshold is not None:
+            # choose the number of bands whose LSH threshold, (1/bands)^(1/rows), is closest to `threshold`
+            self.bands = min([b for b in range(1, num_perm + 1) if num_perm % b == 0],
+                             key=lambda b: abs((1 / b) ** (b / num_perm) - threshold))
+            self.rows = num_perm // self.bands
+
+    def signature(self, text:str):
+        """
+        Returns the MinHash signature of `text`
+        """
+        words = re.findall(r'\w+', text.lower())
+        shingles = {' '.join(words[i:i + self.shingle_size])
+                    for i in range(max(1, len(words) - self.shingle_size + 1))}
+        x = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64)
+        return (((np.outer(x, self._a) + self._b) % np.uint64((1 << 61) - 1)) & np.uint64(0xffffffff)).min(axis=0)
+
+    def _merge(self, kept:Document, doc:Document):
+        source = doc.metadata.get('source')
+        self.sources.add(source)
+        sources = json.loads(kept.metadata.get('duplicate_sources', '[]'))
+        if source and source != kept.metadata.get('source') and source not in sources:
+            with self._lock:
+                kept.metadata['duplicate_sources'] = json.dumps(sources + [source])
+                self.updated[id(kept)] = kept
+
+    def __call__(self, docs:List[Document]) -> List[Document]:
+        """
+        Returns the chunks in `docs` that are not duplicates of previously-seen chunks
+        """
+        results = []
+        for doc in docs:
+            key = hash_key(text=' '.join(doc.page_content.split()))
+            kept = self.hashes.get(key)
+            if kept is not None:
+                self.num_exact += 1
+                self._merge(kept, doc)
+                continue
+            if self.threshold is not None:
+                sig = self.signature(doc.page_content)
+                bands = [(i, sig[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+                for band in bands:
+                    candidate = self.buckets.get(band)
+                    if candidate is not None and np.mean(candidate[1] == sig) >= self.threshold:
+                        kept = candidate[0]
+                        break
+                if kept is not None:
+                    self.num_near += 1
+                    self._merge(kept, doc)
+                    continue
+                for band in bands:
+                    self.buckets.set(band, (doc, sig))
+            self.hashes.set(key, doc)
+            self.sources.add(doc.metadata.get('source'))
+            results.append(doc)
+        return results
+
+    def pop_updated(self):
+        """
+        Returns (and forgets) chunks whose `duplicate_sources` changed since the last call
+        """
+        with self._lock:
+            updated = list(self.updated.values())
+            self.updated = {}
+        return updated
+
+
 def process_documents(
     source_directory: str, # path to folder containing document store
     chunk_size: int = DEFAULT_CHUNK_SIZE, # text is split to this many characters by `langchain.text_splitter.RecursiveCharacterTextSplitter`
     chunk_overlap: int = DEFAULT_CHUNK_OVERLAP, # character overlap between chunks in `langchain.text_splitter.RecursiveCharacterTextSplitter`
-    ignored_files: List[str] = [], # list of files to ignore
+    ignored_files: Optional[Iterable[str]] = None, # filepaths to ignore (a set is used as-is). Folders ending with a path separator ignore all files beneath them.
     ignore_fn:Optional[Callable] = None, # Callable that accepts the file path (including file name) as input and ignores if returns True
     pdf_unstructured:bool=False, # If True, use unstructured for PDF extraction
+    file_paths:Optional[List[str]] = None, # files to load. If None, all supported files in `source_directory` are loaded.
+    dedup:Union[bool, Deduplicator] = False, # If True, duplicate and near-duplicate chunks are dropped (a `Deduplicator` instance can also be supplied)
     **kwargs
 
 
 ) -> List[Document]:
     """
     Load documents and split in chunks.
+    Each chunk is assigned its ID (see `chunk_ids`) before duplicates are dropped,
+    so IDs do not depend on which chunks were duplicates.
     Extra kwargs fed to `ingest.load_single_document`.
     """
     print(f"Loading documents from {source_directory}")
     documents = load_documents(source_directory,
                               ignored_files, ignore_fn=ignore_fn,
-                              pdf_unstructured=pdf_unstructured, **kwargs)
+                              pdf_unstructured=pdf_unstructured,
+                              file_paths=file_paths, **kwargs)
     if not documents:
         print("No new documents to load")
         return
@@ -261,19 +464,15 @@ def process_documents(
         is_markdown = documents[0].metadata.get('markdown', False)
     except:
         is_markdown = False
-    if is_markdown:
-        from langchain_text_splitters.base import Language
-
-        text_splitter = RecursiveCharacterTextSplitter.from_language(
-            language=Language.MARKDOWN,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap)
-    else:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
-        )
+    text_splitter = get_text_splitter(chunk_size, chunk_overlap, is_markdown=is_markdown)
     texts = text_splitter.split_documents(documents)
     print(f"Split into {len(texts)} chunks of text (max. {chunk_size} chars each)")
+    for doc, id in zip(texts, chunk_ids(texts)):
+        doc.id = id
+    if dedup:
+        dedup = Deduplicator() if dedup is True else dedup
+        texts = dedup(texts)
+        print(f"Removed {dedup.num_exact} duplicate and {dedup.num_near} near-duplicate chunks")
     return texts
 
 
@@ -281,9 +480,23 @@ def does_vectorstore_exist(db) -> bool:
     """
     Checks if vectorstore exists
     """
-    if not db.get()["documents"]:
-        return False
-    return True
+    store = db.store if isinstance(db, VectorDB) else db._collection
+    return store.count() > 0
+
+
+def iter_chunk_metadata(db, batch_size:int=CHROMA_MAX):
+    """
+    Iterates over the IDs and metadata of all chunks in vectorstore
+    in pages of size `batch_size` (chunk texts and embeddings are not loaded).
+    Yields `(id, metadata)` tuples.
+    """
+    offset = 0
+    while True:
+        page = db.get(include=['metadatas'], limit=batch_size, offset=offset)
+        if not page['ids']:
+            break
+        yield from zip(page['ids'], page['metadatas'])
+        offset += len(page['ids'])
 
 
 def batchify_chunks(texts):
@@ -295,6 +508,353 @@ def batchify_chunks(texts):
     return split_docs_chunked, total_chunks
 
 
+def source_id(source:str):
+    """
+    Returns the prefix shared by the IDs of all chunks from `source`
+    """
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+def chunk_id(source:str, ordinal:int, text:str):
+    """
+    Returns the ID of a chunk in the form `<source_id>-<ordinal>-<content hash>`
+    """
+    return f"{source_id(source)}-{ordinal}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def chunk_ids(documents:List[Document]):
+    """
+    Returns deterministic IDs for chunks derived from the source of each chunk, its position among
+    the chunks of that source, and its content (see `chunk_id`). Storing the same chunks again yields the same IDs.
+    """
+    counts = {}
+    ids = []
+    for doc in documents:
+        source = doc.metadata.get('source', '')
+        ordinal = counts.get(source, 0)
+        counts[source] = ordinal + 1
+        ids.append(chunk_id(source, ordinal, doc.page_content))
+    return ids
+
+
+
+def file_hash(file_path:str, block_size:int=1 << 20):
+    """
+    Returns the SHA-256 hex digest of the contents of a file
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+MANIFEST_NAME = "manifest.sqlite"
+
+class Manifest:
+    def __init__(self, path:str):
+        """
+        Records the size, modification time, content hash, and chunk IDs of each file
+        ingested into a vector database. The manifest is stored as a SQLite database at `path`.
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS files '
+                              '(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT, chunk_ids TEXT)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS files_hash ON files (hash)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def _to_dict(self, row):
+        if row is None: return None
+        return {'path':row[0], 'size':row[1], 'mtime':row[2], 'hash':row[3], 'chunk_ids':json.loads(row[4])}
+
+    def get(self, path:str):
+        """
+        Returns the entry for `path` as a dictionary (or None if `path` has not been ingested)
+        """
+        return self._to_dict(self.conn.execute('SELECT * FROM files WHERE path = ?', (path,)).fetchone())
+
+    def find(self, hash:str):
+        """
+        Returns an entry for a file with content hash `hash` (or None if there is no such file)
+        """
+        return self._to_dict(self.conn.execute('SELECT * FROM files WHERE hash = ? LIMIT 1', (hash,)).fetchone())
+
+    def put(self, path:str, size:Optional[int], mtime:Optional[float], hash:Optional[str], chunk_ids:List[str]):
+        """
+        Adds or replaces the entry for `path`
+        """
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                              (path, size, mtime, hash, json.dumps(chunk_ids)))
+
+    def delete(self, path:str):
+        """
+        Removes the entry for `path`
+        """
+        with self.conn:
+            self.conn.execute('DELETE FROM files WHERE path = ?', (path,))
+
+    def references(self, ids:List[str], exclude:Optional[str]=None):
+        """
+        Returns a dictionary mapping each ID in `ids` listed in the chunk IDs of an entry (other than the entry for `exclude`)
+        to the paths of those entries
+        """
+        refs = {}
+        for lst in U.split_list(list(ids), 500):
+            rows = self.conn.execute('SELECT json_each.value, files.path FROM files, json_each(files.chunk_ids) '
+                                     'WHERE files.path IS NOT ? AND json_each.value IN (%s)' % ','.join('?' * len(lst)),
+                                     [exclude] + lst)
+            for id, path in rows:
+                refs.setdefault(id, []).append(path)
+        return refs
+
+    def paths(self, prefix:Optional[str]=None):
+        """
+        Returns a list of ingested file paths (optionally only those starting with `prefix`)
+        """
+        if prefix is None:
+            rows = self.conn.execute('SELECT path FROM files')
+        else:
+            rows = self.conn.execute('SELECT path FROM files WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))
+        return [row[0] for row in rows]
+
+    def clear(self):
+        """
+        Removes all entries
+        """
+        with self.conn:
+            self.conn.execute('DELETE FROM files')
+
+    @property
+    def version(self):
+        """
+        Number of times chunks in the vector database have changed (see `bump_version`)
+        """
+        row = self.conn.execute("SELECT value FROM info WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_version(self):
+        """
+        Records that chunks in the vector database have changed (e.g., so that cached search results are no longer used)
+        """
+        with self.conn:
+            self.conn.execute("INSERT INTO info VALUES ('version', '1') "
+                              "ON CONFLICT (name) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+
+ONNX_MODELS = "onnx_models"
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self,
+                 model_name:str,
+                 quantize:bool=True,
+                 batch_size:int=32,
+                 normalize_embeddings:bool=False,
+                 num_threads:Optional[int]=None,
+                 onnx_path:Optional[str]=None):
+        """
+        LangChain-compatible embeddings computed with ONNX Runtime (using `onprem.hf.models.pooling.factory.PoolingFactory` and
+        `onprem.hf.models.onnx.OnnxModel`) instead of PyTorch, which is faster and uses less memory on CPUs.
+
+        **Args:**
+
+        - *model_name*: Path to an ONNX pooling model (ending in `.onnx`) or name of a sentence-transformers model.
+                        Sentence-transformers models are exported to ONNX with `onprem.hf.train.hfonnx.HFOnnx` on first use.
+                        The tokenizer of an ONNX model is loaded from the folder containing it.
+        - *quantize*: If True, exported models are quantized to int8
+        - *batch_size*: Number of texts embedded at a time
+        - *normalize_embeddings*: If True, embeddings are scaled to unit length
+        - *num_threads*: Number of threads used by ONNX Runtime. Default is chosen by ONNX Runtime.
+        - *onnx_path*: Where to save exported models. Default is `onprem_data/onnx_models/<model_name>/model.onnx`
+                       in user's home directory (`-int8` is appended if quantized).
+        """
+        from onprem.hf.models.pooling.factory import PoolingFactory
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+        self.num_threads = num_threads
+        if model_name.endswith('.onnx'):
+            self.path = model_name
+        else:
+            self.path = onnx_path or os.path.join(get_datadir(), ONNX_MODELS, model_name.replace('/', '--'),
+                                                  'model-int8.onnx' if quantize else 'model.onnx')
+            if not os.path.isfile(self.path):
+                self.export(model_name, self.path, quantize=quantize)
+        self.model = PoolingFactory.create({'path': self.path, 'tokenizer': os.path.dirname(os.path.abspath(self.path)),
+                                            'device': -1})
+        if num_threads:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            self.model.model.model = ort.InferenceSession(self.path, options, self.model.model.providers())
+
+    @staticmethod
+    def export(model_name:str, path:str, quantize:bool=True):
+        """
+        Exports the sentence-transformers model `model_name` (including pooling) to an ONNX model at `path`
+        and saves its tokenizer in the same folder. Returns `path`.
+        """
+        from transformers import AutoTokenizer
+        from onprem.hf.train.hfonnx import HFOnnx
+        from onprem.hf.models.pooling.factory import PoolingFactory
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        print(f"Exporting {model_name} to {path}...")
+        HFOnnx()(model_name, task='pooling', output=path, quantize=quantize)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        maxlength = PoolingFactory.maxlength(model_name)
+        if maxlength:
+            tokenizer.model_max_length = maxlength
+        tokenizer.save_pretrained(folder)
+        return path
+
+    def _embed(self, texts:List[str]):
+        embeddings = self.model.encode(texts, batch=self.batch_size)
+        if self.normalize_embeddings:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.tolist()
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        return self._embed(texts) if texts else []
+
+    def embed_query(self, text:str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def get_embeddings(model_name:str,
+                   model_kwargs:dict={},
+                   encode_kwargs:dict={},
+                   backend:str='torch'):
+    """
+    Returns LangChain-compatible embeddings for `model_name` computed with
+    PyTorch (`backend='torch'`) or ONNX Runtime (`backend='onnx'`).
+    `backend` is always `'onnx'` if `model_name` is a path ending in `.onnx`.
+    With ONNX Runtime, only the `quantize`, `num_threads`, and `onnx_path` keys of `model_kwargs` are used
+    (other keys such as `device` are ignored, as ONNX Runtime uses a GPU if `onnxruntime-gpu` is installed).
+    """
+    if backend == 'onnx' or model_name.endswith('.onnx'):
+        return OnnxEmbeddings(model_name,
+                              batch_size=encode_kwargs.get('batch_size', 32),
+                              normalize_embeddings=encode_kwargs.get('normalize_embeddings', False),
+                              **{k: v for k, v in model_kwargs.items() if k in ['quantize', 'num_threads', 'onnx_path']})
+    elif backend == 'torch':
+        return HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
+    else:
+        raise ValueError(f"backend must be one of {{'torch', 'onnx'}}, but got '{backend}'")
+
+
+_worker_embeddings = None
+
+def _init_embedding_worker(factory:Callable, kwargs:dict, num_threads:int):
+    """
+    Loads a copy of the embedding model in a worker process
+    """
+    global _worker_embeddings
+    for var in ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']:
+        os.environ[var] = str(num_threads)
+    import torch
+    torch.set_num_threads(num_threads)
+    _worker_embeddings = factory(**kwargs)
+
+
+def _embed_batch(texts:List[str]):
+    """
+    Embeds a batch of texts in a worker process
+    """
+    return _worker_embeddings.embed_documents(texts)
+
+
+class EmbeddingEngine(Embeddings):
+    def __init__(self,
+                 embeddings:Union[HuggingFaceEmbeddings, OnnxEmbeddings],
+                 num_workers:Optional[int]=None,
+                 batch_size:int=32,
+                 threads_per_worker:Optional[int]=None):
+        """
+        Computes embeddings for documents in `num_workers` processes, each with its own copy of the embedding model.
+        Texts are sorted by length before being split into batches (as in `onprem.hf.models.pooling.base.Pooling.encode`),
+        so texts of similar length are padded together, and batches are handed to workers as they become free.
+        Queries are embedded with `embeddings` in the current process.
+
+        **Args:**
+
+        - *embeddings*: `HuggingFaceEmbeddings` or `OnnxEmbeddings` instance whose model and settings are used by workers
+        - *num_workers*: Number of worker processes. Default is the number of CPUs.
+        - *batch_size*: Number of texts embedded at a time by each worker
+        - *threads_per_worker*: Number of threads used by each worker. Default divides the CPUs evenly among workers to avoid oversubscription.
+        """
+        self.embeddings = embeddings
+        self.num_workers = num_workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.threads_per_worker = threads_per_worker or max(1, os.cpu_count() // self.num_workers)
+        self.pool = None
+        self.num_texts = 0
+        self.seconds = 0.0
+
+    def start(self):
+        """
+        Starts worker processes (done automatically on first use)
+        """
+        if self.pool is None:
+            if isinstance(self.embeddings, OnnxEmbeddings):
+                kwargs = dict(model_name=self.embeddings.path, batch_size=self.batch_size,
+                              normalize_embeddings=self.embeddings.normalize_embeddings,
+                              num_threads=self.threads_per_worker)
+            else:
+                kwargs = dict(model_name=self.embeddings.model_name, model_kwargs=self.embeddings.model_kwargs,
+                              encode_kwargs=dict(self.embeddings.encode_kwargs, batch_size=self.batch_size))
+            self.pool = multiprocessing.get_context('spawn').Pool(
+                processes=self.num_workers,
+                initializer=_init_embedding_worker,
+                initargs=(type(self.embeddings), kwargs, self.threads_per_worker))
+            self._finalizer = weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def close(self):
+        """
+        Stops worker processes
+        """
+        if self.pool is not None:
+            self._finalizer.detach()
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.time()
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        batches = list(U.split_list([texts[i] for i in order], self.batch_size))
+        sorted_results = []
+        for embeddings in self.start().imap(_embed_batch, batches):
+            sorted_results.extend(embeddings)
+        results = [None] * len(texts)
+        for i, embedding in zip(order, sorted_results):
+            results[i] = embedding
+        self.num_texts += len(texts)
+        self.seconds += time.time() - start
+        return results
+
+    def embed_query(self, text:str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        """
+        Returns a dictionary with keys: `texts`, `seconds`, `texts_per_second`
+        """
+        return {'texts': self.num_texts, 'seconds': self.seconds,
+                'texts_per_second': self.num_texts / self.seconds if self.seconds else 0.0}
+
 
 os.environ["TOKENIZERS_PARALLELISM"] = "0"
 DEFAULT_DB = "vectordb"
@@ -307,6 +867,14 @@ class Ingester:
         embedding_model_kwargs: dict = {"device": "cpu"},
         embedding_encode_kwargs: dict = {"normalize_embeddings": False},
         persist_directory: Optional[str] = None,
+        embedding_cache: bool = False,
+        embedding_cache_path: Optional[str] = None,
+        embedding_workers: int = 0,
+        embedding_batch_size: int = 32,
+        embedding_backend: str = 'torch',
+        vectordb_backend: str = 'chroma',
+        vectordb_kwargs: dict = {},
+        sparse_index: bool = False,
     ):
         """
         Ingests all documents in `source_folder` (previously-ingested documents are ignored)
@@ -319,6 +887,22 @@ class Ingester:
                                        embedding model (e.g., `{'normalize_embeddings': False}`).
           - *persist_directory*: Path to vector database (created if it doesn't exist).
                                  Default is `onprem_data/vectordb` in user's home directory.
+          - *embedding_cache*: If True, embeddings of chunks are cached on disk (keyed by embedding model and chunk text),
+                               so identical chunks are only embedded once, even across different vector databases.
+          - *embedding_cache_path*: Path to embedding cache. Default is `onprem_data/embedding_cache` in user's home directory.
+          - *embedding_workers*: If greater than 1, chunks are embedded by this many worker processes
+                                 using an `EmbeddingEngine` (each process loads its own copy of the embedding model).
+          - *embedding_batch_size*: Number of chunks embedded at a time by each worker when `embedding_workers > 1`.
+          - *embedding_backend*: One of {'torch', 'onnx'}. If 'onnx', embeddings are computed with ONNX Runtime using
+                                 an int8-quantized export of `embedding_model` (see `OnnxEmbeddings`).
+                                 Also used if `embedding_model` is a path to an `.onnx` file.
+                                 Only some keys of `embedding_model_kwargs` are then used (see `get_embeddings`).
+          - *vectordb_backend*: One of {'chroma', 'hnsw', 'quantized'}. If 'hnsw', chunks are stored in an in-process
+                                `onprem.vectorstore.HNSWStore` instead of Chroma. If 'quantized', chunks are stored in an
+                                `onprem.vectorstore.QuantizedStore`, which keeps quantized embeddings on disk for low-memory retrieval.
+          - *vectordb_kwargs*: Extra arguments to the vector store (e.g., `{'quantization': 'pq'}` for `vectordb_backend='quantized'`)
+          - *sparse_index*: If True, chunks are also added to a `onprem.retrieval.BM25Index` stored with the vector database
+                            for keyword search. Once created, the index is kept up to date even if `sparse_index=False`.
 
 
         **Returns**: `None`
@@ -326,78 +910,451 @@ class Ingester:
         self.persist_directory = persist_directory or os.path.join(
             get_datadir(), DEFAULT_DB
         )
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model_name,
+        self.embeddings = get_embeddings(
+            embedding_model_name,
             model_kwargs=embedding_model_kwargs,
             encode_kwargs=embedding_encode_kwargs,
+            backend=embedding_backend,
         )
-        self.chroma_settings = Settings(
-            persist_directory=self.persist_directory, anonymized_telemetry=False
-        )
-        self.chroma_client = chromadb.PersistentClient(
-            settings=self.chroma_settings, path=self.persist_directory
-        )
+        self.embedding_engine = None
+        if embedding_workers > 1:
+            self.embedding_engine = EmbeddingEngine(self.embeddings, num_workers=embedding_workers,
+                                                    batch_size=embedding_batch_size)
+            self.embeddings = self.embedding_engine
+        self.embedding_cache = None
+        if embedding_cache:
+            self.embedding_cache = EmbeddingCache(
+                embedding_cache_path or os.path.join(get_datadir(), EMBEDDING_CACHE_NAME),
+                model_name=hash_key(model_name=embedding_model_name, encode_kwargs=embedding_encode_kwargs,
+                                    backend=embedding_backend))
+            self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache)
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.vectordb_backend = vectordb_backend
+        self.store = get_store(self.persist_directory, backend=vectordb_backend, **vectordb_kwargs)
+        self.sparse_index = None
+        if sparse_index or os.path.exists(os.path.join(self.persist_directory, BM25_NAME)):
+            self.get_sparse_index()
+        self.manifest = Manifest(os.path.join(self.persist_directory, MANIFEST_NAME))
         return
 
     def get_db(self):
         """
         Returns an instance to the `langchain_chroma.Chroma` instance
+        (or `onprem.vectorstore.VectorDB` instance if `vectordb_backend` is not 'chroma')
         """
-        db = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embeddings,
-            client_settings=self.chroma_settings,
-            client=self.chroma_client,
-            collection_metadata={"hnsw:space": "cosine"},
-            collection_name=COLLECTION_NAME,
-        )
+        db = self.store.as_langchain(self.embeddings)
         return db if does_vectorstore_exist(db) else None
 
     def get_embedding_model(self):
         """
-        Returns an instance to the `langchain_huggingface.HuggingFaceEmbeddings` instance
+        Returns an instance to the `langchain_huggingface.HuggingFaceEmbeddings` (or `OnnxEmbeddings`) instance
+        (wrapped in an `EmbeddingEngine` if `embedding_workers > 1` and in `onprem.cache.CachedEmbeddings` if `embedding_cache=True`)
         """
         return self.embeddings
 
 
+    def get_sparse_index(self):
+        """
+        Returns the `onprem.retrieval.BM25Index` of chunks in the vector database (created if it doesn't exist)
+        """
+        if self.sparse_index is None:
+            self.sparse_index = BM25Index(os.path.join(self.persist_directory, BM25_NAME))
+        if len(self.sparse_index) != self.store.count():
+            # add chunks stored before index was created
+            self.sparse_index.clear()
+            offset = 0
+            while True:
+                page = self.store.get(include=['documents'], limit=CHROMA_MAX, offset=offset)
+                if not page['ids']:
+                    break
+                self.sparse_index.add(page['ids'], page['documents'])
+                offset += len(page['ids'])
+        return self.sparse_index
+
+
     def get_ingested_files(self):
         """
         Returns a list of files previously added to vector database (typically via `LLM.ingest`)
         """
-        return set([d['source'] for d in self.get_db().get()['metadatas']])
+        db = self.get_db()
+        if not db:
+            return set()
+        self._check_manifest(db)
+        return set(self.manifest.paths())
 
 
-    def store_documents(self, documents):
+    def store_documents(self,
+                        documents,
+                        batch_size:int=1000, # number of chunks embedded and written at a time
+                        max_retries:int=3, # number of times a failed write is retried
+                        ):
         """
-        Stores instances of `langchain_core.documents.base.Document` in vectordb
+        Stores instances of `langchain_core.documents.base.Document` in vectordb.
+        Embeddings for the next batch are computed while the current batch is written.
+        Chunk IDs are deterministic (see `chunk_ids`) and chunks already in the vector database are skipped,
+        so an interrupted call can simply be repeated without re-computing embeddings of stored chunks.
+        Chunks that already have an ID (e.g., assigned by `process_documents`) keep it.
+        Returns the IDs assigned to the documents.
         """
         if not documents:
             return
+        ids = [doc.id or id for doc, id in zip(documents, chunk_ids(documents))]
         db = self.get_db()
         if db:
-            print("Creating embeddings. May take some minutes...")
-            chunk_batches, total_chunks = batchify_chunks(documents)
-            for lst in tqdm(chunk_batches, total=total_chunks):
-                db.add_documents(lst)
-        else:
-            chunk_batches, total_chunks = batchify_chunks(documents)
-            print("Creating embeddings. May take some minutes...")
-            db = None
-
-            for lst in tqdm(chunk_batches, total=total_chunks):
-                if not db:
-                    db = Chroma.from_documents(
-                        lst,
-                        self.embeddings,
-                        persist_directory=self.persist_directory,
-                        client_settings=self.chroma_settings,
-                        client=self.chroma_client,
-                        collection_metadata={"hnsw:space": "cosine"},
-                        collection_name=COLLECTION_NAME,
-                    )
-                else:
-                    db.add_documents(lst)
-        return
+            self._check_manifest(db)
+        collection = self.store
+        print("Creating embeddings. May take some minutes...")
+        batches = list(U.split_list(list(zip(documents, ids)), batch_size))
+
+        def submit(executor, batch):
+            # skip chunks that were already stored
+            existing = set(collection.get(ids=[id for _, id in batch], include=[])['ids'])
+            new = [(doc, id) for doc, id in batch if id not in existing]
+            return new, executor.submit(self.embeddings.embed_documents, [doc.page_content for doc, _ in new])
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = submit(executor, batches[0])
+            for i in tqdm(range(len(batches))):
+                new, future = pending
+                embeddings = future.result()
+                if i + 1 < len(batches):
+                    # embed next batch while this batch is written
+                    pending = submit(executor, batches[i + 1])
+                self._write_chunks(collection, [doc for doc, _ in new], [id for _, id in new], embeddings,
+                                   max_retries=max_retries)
+                self._record_chunks([doc for doc, _ in batches[i]], [id for _, id in batches[i]])
+        self.store.persist()
+        self._report_embedding_cache()
+        return ids
+
+
+    def _write_chunks(self, collection, documents, ids:List[str], embeddings, max_retries:int=3):
+        """
+        Upserts chunks and their embeddings to `collection`, retrying failed writes
+        """
+        for lst in U.split_list(list(range(len(ids))), CHROMA_MAX):
+            for attempt in range(max_retries + 1):
+                try:
+                    collection.upsert(ids=[ids[i] for i in lst],
+                                      embeddings=[embeddings[i] for i in lst],
+                                      metadatas=[documents[i].metadata or None for i in lst],
+                                      documents=[documents[i].page_content for i in lst])
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        raise
+                    logger.warning(f'\nRetrying write of {len(lst)} chunks due to error: {str(e)}')
+                    time.sleep(min(2 ** attempt, 30))
+            if self.sparse_index is not None:
+                self.sparse_index.add([ids[i] for i in lst], [documents[i].page_content for i in lst])
+            self.manifest.bump_version()
+
+
+    def _report_embedding_cache(self):
+        """
+        Prints hit rate of embedding cache and throughput of embedding engine
+        """
+        if self.embedding_engine is not None:
+            stats = self.embedding_engine.stats()
+            print(f"Embedding engine: {stats['texts']} chunks in {stats['seconds']:.1f}s " +\
+                  f"({stats['texts_per_second']:.1f} chunks/s with {self.embedding_engine.num_workers} workers)")
+        if self.embedding_cache is None:
+            return
+        stats = self.embedding_cache.stats()
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses " +\
+              f"({stats['hit_rate']:.1%} hit rate, {stats['size']} cached embeddings)")
+
+
+    def _record_chunks(self, documents, ids:List[str]):
+        """
+        Records the chunk IDs of each source in the manifest.
+        A chunk kept in place of duplicates (see `Deduplicator`) is also recorded for each of its `duplicate_sources`,
+        so that it is not deleted while any of these files remain.
+        """
+        chunk_ids = {}
+        for doc, id in zip(documents, ids):
+            for source in [doc.metadata.get('source')] + json.loads(doc.metadata.get('duplicate_sources', '[]')):
+                if source:
+                    chunk_ids.setdefault(source, []).append(id)
+        for path, lst in chunk_ids.items():
+            entry = self.manifest.get(path)
+            if entry:
+                lst = list(dict.fromkeys(entry['chunk_ids'] + lst))
+                self.manifest.put(path, entry['size'], entry['mtime'], entry['hash'], lst)
+            else:
+                self.manifest.put(path, None, None, None, lst)
+
+
+    def _stream_documents(self,
+                          source_directory:str,
+                          file_paths:List[str],
+                          chunk_size:int=DEFAULT_CHUNK_SIZE,
+                          chunk_overlap:int=DEFAULT_CHUNK_OVERLAP,
+                          pdf_unstructured:bool=False,
+                          batch_size:int=1000,
+                          queue_size:int=4,
+                          dedup:Optional[Deduplicator]=None,
+                          max_retries:int=3,
+                          **kwargs):
+        """
+        Loads, splits, embeds, and stores `file_paths` as a pipeline of stages connected by bounded queues.
+        Loading runs in a process pool, while splitting and embedding each run in their own thread
+        and the calling thread writes to the vector database. Each stage blocks when the next stage falls behind,
+        so at most about `queue_size` batches of `batch_size` chunks are held in memory at a time.
+        As in `store_documents`, chunks already in the vector database are not embedded again.
+        Returns the number of chunks stored.
+        """
+        collection = self.store
+        done = object()
+        splits = queue.Queue(maxsize=queue_size)
+        embedded = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(q):
+            while True:
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set(): return done
+
+        def split():
+            try:
+                batch = []
+                for docs in iter_documents(source_directory, pdf_unstructured=pdf_unstructured,
+                                           file_paths=file_paths, **kwargs):
+                    splitter = get_text_splitter(chunk_size, chunk_overlap,
+                                                 is_markdown=docs[0].metadata.get('markdown', False))
+                    chunks = splitter.split_documents(docs)
+                    for doc, id in zip(chunks, chunk_ids(chunks)):
+                        doc.id = id
+                    batch.extend(dedup(chunks) if dedup else chunks)
+                    while len(batch) >= batch_size:
+                        if not put(splits, batch[:batch_size]): return
+                        batch = batch[batch_size:]
+                    if stop.is_set(): return
+                if batch:
+                    put(splits, batch)
+                put(splits, done)
+            except Exception as e:
+                put(splits, e)
+
+        def embed():
+            try:
+                while True:
+                    batch = get(splits)
+                    if batch is done or isinstance(batch, Exception):
+                        put(embedded, batch)
+                        return
+                    existing = set(collection.get(ids=[doc.id for doc in batch], include=[])['ids'])
+                    new = [doc for doc in batch if doc.id not in existing]
+                    embeddings = self.embeddings.embed_documents([doc.page_content for doc in new])
+                    if not put(embedded, (batch, new, embeddings)): return
+            except Exception as e:
+                put(embedded, e)
+
+        threads = [threading.Thread(target=split, daemon=True), threading.Thread(target=embed, daemon=True)]
+        for t in threads: t.start()
+        num_chunks = 0
+        try:
+            while True:
+                item = get(embedded)
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                batch, new, embeddings = item
+                self._write_chunks(collection, new, [doc.id for doc in new], embeddings, max_retries=max_retries)
+                self._record_chunks(batch, [doc.id for doc in batch])
+                num_chunks += len(batch)
+                if dedup:
+                    # update metadata of stored chunks with duplicates found since they were stored
+                    updated = {doc.id: doc for doc in dedup.pop_updated()}
+                    stored = collection.get(ids=list(updated), include=[])['ids'] if updated else []
+                    for lst in U.split_list(stored, CHROMA_MAX):
+                        collection.update(ids=lst, metadatas=[updated[id].metadata for id in lst])
+                        self.manifest.bump_version()
+                    self._record_chunks([updated[id] for id in stored], stored)
+        finally:
+            stop.set()
+            for t in threads: t.join()
+            self.store.persist()
+        print(f"Stored {num_chunks} chunks of text (max. {chunk_size} chars each)")
+        if dedup:
+            print(f"Removed {dedup.num_exact} duplicate and {dedup.num_near} near-duplicate chunks")
+        self._report_embedding_cache()
+        return num_chunks
+
+
+    def _backfill_manifest(self, db):
+        """
+        Adds files in vector databases created before manifests existed to the manifest.
+        Content hashes are left empty, so these files are re-ingested only if their size or modification time changes.
+        """
+        sources = {}
+        for id, metadata in iter_chunk_metadata(db):
+            if metadata and metadata.get('source'):
+                sources.setdefault(metadata['source'], []).append(id)
+        for path, ids in sources.items():
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                self.manifest.put(path, stat.st_size, stat.st_mtime, None, ids)
+            else:
+                self.manifest.put(path, None, None, None, ids)
+
+
+    def _check_manifest(self, db):
+        """
+        Backfills the manifest if the vector database was created before manifests existed
+        """
+        if not len(self.manifest):
+            self._backfill_manifest(db)
+
+
+    def delete_source(self, path:str):
+        """
+        Deletes all chunks of the file `path` from the vector database.
+        Chunk IDs are looked up in the ingestion manifest (or by the `source` metadata of chunks
+        if `path` is not in the manifest), so the collection is not scanned.
+        Chunks that were also kept for other files (see `Deduplicator`) are not deleted (see `Ingester._release_chunks`).
+        Returns the number of chunks deleted.
+        """
+        path = os.path.abspath(path)
+        num_deleted = self._release_chunks(path, self._source_chunk_ids(path))
+        self.store.persist()
+        self.manifest.delete(path)
+        return num_deleted
+
+
+    def update_source(self,
+                      path:str, # path to file
+                      chunk_size:int=DEFAULT_CHUNK_SIZE, # text is split to this many characters
+                      chunk_overlap:int=DEFAULT_CHUNK_OVERLAP, # character overlap between chunks
+                      pdf_unstructured:bool=False, # If True, use unstructured for PDF extraction
+                      **kwargs):
+        """
+        Re-ingests the file `path` (or deletes its chunks if it no longer exists).
+        Chunks whose position and content are unchanged keep their IDs and are not embedded again,
+        new or changed chunks are upserted, and chunks that no longer exist are deleted.
+        Extra kwargs fed to `ingest.load_single_document`.
+        Returns the IDs of the chunks of `path`.
+        """
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            self.delete_source(path)
+            return []
+        old_ids = self._source_chunk_ids(path)
+        stat = os.stat(path)
+        h = file_hash(path)
+        self.manifest.put(path, None, None, None, [])
+        docs = load_single_document(path, pdf_unstructured=pdf_unstructured, **kwargs) or []
+        texts = []
+        if docs:
+            splitter = get_text_splitter(chunk_size, chunk_overlap, is_markdown=docs[0].metadata.get('markdown', False))
+            texts = splitter.split_documents(docs)
+        ids = self.store_documents(texts) or []
+        current = set(ids)
+        self._release_chunks(path, [id for id in old_ids if id not in current])
+        self.store.persist()
+        self.manifest.put(path, stat.st_size, stat.st_mtime, h, ids)
+        return ids
+
+
+    def _source_chunk_ids(self, path:str):
+        """
+        Returns the IDs of all chunks of `path`
+        """
+        entry = self.manifest.get(path)
+        if entry:
+            return entry['chunk_ids']
+        return self.store.get(where={'source': path}, include=[])['ids']
+
+
+    def _delete_chunks(self, ids:List[str]):
+        """
+        Deletes chunks from the vector database by ID
+        """
+        for lst in U.split_list(ids, CHROMA_MAX):
+            self.store.delete(ids=lst)
+            if self.sparse_index is not None:
+                self.sparse_index.delete(lst)
+            self.manifest.bump_version()
+
+
+    def _release_chunks(self, path:str, ids:List[str]):
+        """
+        Deletes chunks in `ids` that are no longer needed by the file `path`.
+        Chunks still listed in the manifest for other files (i.e., duplicates kept for several files) are not deleted,
+        but their `source` and `duplicate_sources` metadata are updated to those files.
+        Returns the number of chunks deleted.
+        """
+        refs = self.manifest.references(ids, exclude=path)
+        deleted = [id for id in ids if id not in refs]
+        self._delete_chunks(deleted)
+        shared = [id for id in ids if id in refs]
+        for lst in U.split_list(shared, CHROMA_MAX):
+            chunks = self.store.get(ids=lst, include=['metadatas'])
+            metadatas = []
+            for id, metadata in zip(chunks['ids'], chunks['metadatas']):
+                sources = list(dict.fromkeys(refs[id]))
+                metadata = dict(metadata or {})
+                metadata['source'] = metadata.get('source') if metadata.get('source') in sources else sources[0]
+                metadata['duplicate_sources'] = json.dumps([source for source in sources if source != metadata['source']])
+                metadatas.append(metadata)
+            if chunks['ids']:
+                self.store.update(ids=chunks['ids'], metadatas=metadatas)
+                self.manifest.bump_version()
+        return len(deleted)
+
+
+    def _copy_chunks(self, ids:List[str], old_path:str, new_path:str, dedup:bool=False):
+        """
+        Copies chunks (including embeddings) of `old_path` to `new_path` without re-computing embeddings.
+        Chunks that are shared with other files (i.e., chunks of other files kept in place of duplicates in `old_path`
+        and chunks of `old_path` kept in place of duplicates in other files, see `Deduplicator`) are not copied,
+        and `new_path` is added to their `duplicate_sources` instead. If `dedup` is True, no chunks are copied.
+        Returns the IDs of the chunks of `new_path`.
+        """
+        collection = self.store
+        new_ids = []
+        ordinal = 0
+        for lst in U.split_list(ids, CHROMA_MAX):
+            chunks = collection.get(ids=lst, include=['embeddings', 'documents', 'metadatas'])
+            copied, shared = [], []
+            for i, metadata in enumerate(chunks['metadatas']):
+                metadata = metadata or {}
+                source = metadata.get('source')
+                is_shared = dedup or (source and source != old_path) or json.loads(metadata.get('duplicate_sources', '[]'))
+                (shared if is_shared else copied).append(i)
+            metadatas = [{k: new_path if v == old_path else v for k, v in chunks['metadatas'][i].items()}
+                         for i in copied]
+            documents = [chunks['documents'][i] for i in copied]
+            lst_ids = [chunk_id(new_path, ordinal + i, document) for i, document in enumerate(documents)]
+            ordinal += len(lst_ids)
+            if lst_ids:
+                collection.upsert(ids=lst_ids, embeddings=[chunks['embeddings'][i] for i in copied],
+                                  metadatas=metadatas, documents=documents)
+                if self.sparse_index is not None:
+                    self.sparse_index.add(lst_ids, documents)
+            if shared:
+                metadatas = []
+                for i in shared:
+                    metadata = dict(chunks['metadatas'][i] or {})
+                    sources = json.loads(metadata.get('duplicate_sources', '[]'))
+                    metadata['duplicate_sources'] = json.dumps(list(dict.fromkeys(sources + [new_path])))
+                    metadatas.append(metadata)
+                collection.update(ids=[chunks['ids'][i] for i in shared], metadatas=metadatas)
+            self.manifest.bump_version()
+            new_ids.extend(lst_ids + [chunks['ids'][i] for i in shared])
+        return new_ids
 
 
     def ingest(
@@ -407,14 +1364,24 @@ class Ingester:
         chunk_overlap: int = DEFAULT_CHUNK_OVERLAP, # character overlap between chunks in `langchain.text_splitter.RecursiveCharacterTextSplitter`
         ignore_fn:Optional[Callable] = None, # Optional function that accepts the file path (including file name) as input and returns `True` if file path should not be ingested.
         pdf_unstructured:bool=False, # If True, use unstructured for PDF extraction
+        delete_missing:bool=False, # If True, chunks of previously-ingested files in `source_directory` that no longer exist are deleted from the vector database.
+        stream:bool=False, # If True, loading, splitting, embedding, and storing run concurrently as a pipeline with constant memory use.
+        batch_size:int=1000, # number of chunks embedded and stored at a time
+        queue_size:int=4, # maximum number of batches waiting between pipeline stages when `stream=True`
+        dedup:Union[bool, Deduplicator]=False, # If True, duplicate and near-duplicate chunks are dropped (see `Deduplicator`). Only chunks ingested in this call are compared.
+        max_retries:int=3, # number of times a failed write to the vector database is retried
         **kwargs
     ) -> None:
         """
         Ingests all documents in `source_directory` (previously-ingested documents are
-        ignored). When retrieved, the
+        ignored unless they have changed). When retrieved, the
         [Document](https://api.python.langchain.com/en/latest/documents/langchain_core.documents.base.Document.html)
         objects will each have a `metadata` dict with the absolute path to the file
         in `metadata["source"]`.
+        The size, modification time, content hash, and chunk IDs of ingested files are recorded in a
+        manifest stored with the vector database, so that only new or changed files are loaded on subsequent calls.
+        Files identical to previously-ingested files (e.g., moved or renamed files) reuse existing embeddings
+        (and, if `dedup` is True, existing chunks instead of copies of them).
         Extra kwargs fed to `ingest.load_single_document`.
         """
 
@@ -429,23 +1396,105 @@ class Ingester:
         if db:
             # Update and store locally vectorstore
             print(f"Appending to existing vectorstore at {self.persist_directory}")
-            collection = db.get()
-            ignored_files=[ metadata["source"] for metadata in collection["metadatas"]]
+            self._check_manifest(db)
         else:
             print(f"Creating new vectorstore at {self.persist_directory}")
-            ignored_files = []
+            self.manifest.clear()
 
-        texts = process_documents(
-            source_directory,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            ignored_files=ignored_files,
-            ignore_fn=ignore_fn,
-            pdf_unstructured=pdf_unstructured,
-            **kwargs
+        # compare files with manifest
+        source_directory = os.path.abspath(source_directory)
+        all_files = [file_path for file_path in dict.fromkeys(extract_files(source_directory))
+                     if not os.path.basename(file_path).startswith('~$')
+                     and (ignore_fn is None or not ignore_fn(file_path))]
+        file_info = {}
+        new_files, changed_files, moved_files, resumed_files = [], [], [], []
+        for file_path in all_files:
+            stat = os.stat(file_path)
+            entry = self.manifest.get(file_path)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            h = file_hash(file_path)
+            file_info[file_path] = (stat.st_size, stat.st_mtime, h)
+            if entry and entry['hash'] == h:
+                self.manifest.put(file_path, stat.st_size, stat.st_mtime, h, entry['chunk_ids'])
+                continue
+            if entry and entry['size'] is None and entry['hash'] is None:
+                # file was not fully ingested (e.g., ingestion was interrupted)
+                resumed_files.append((file_path, entry))
+                continue
+            if entry:
+                changed_files.append((file_path, entry))
+                continue
+            same = self.manifest.find(h)
+            if same:
+                moved_files.append((file_path, same))
+            else:
+                new_files.append(file_path)
+        removed_files = []
+        if delete_missing:
+            all_files_set = set(all_files)
+            removed_files = [path for path in self.manifest.paths(prefix=source_directory + os.sep)
+                             if path not in all_files_set]
+        print(f"Found {len(new_files)} new, {len(changed_files)} changed, {len(moved_files)} moved/copied, " +\
+              f"{len(resumed_files)} partially-ingested, and {len(removed_files)} removed files")
 
-        )
-        self.store_documents(texts)
+        # reuse embeddings of moved or copied files
+        for file_path, entry in moved_files:
+            ids = self._copy_chunks(entry['chunk_ids'], entry['path'], file_path, dedup=bool(dedup))
+            self.manifest.put(file_path, *file_info[file_path], ids)
+
+        # delete chunks of removed files
+        for file_path in removed_files:
+            self.delete_source(file_path)
+
+        # unchanged chunks of changed and partially-ingested files are kept (and stale chunks deleted below)
+        for file_path, entry in changed_files + resumed_files:
+            self.manifest.put(file_path, None, None, None, [])
+
+        file_paths = new_files + [file_path for file_path, _ in changed_files + resumed_files]
+        dedup = Deduplicator() if dedup is True else (dedup or None)
+        if file_paths and stream:
+            texts = self._stream_documents(
+                source_directory,
+                file_paths,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                pdf_unstructured=pdf_unstructured,
+                batch_size=batch_size,
+                queue_size=queue_size,
+                dedup=dedup,
+                max_retries=max_retries,
+                **kwargs
+            )
+        elif file_paths:
+            texts = process_documents(
+                source_directory,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                pdf_unstructured=pdf_unstructured,
+                file_paths=file_paths,
+                dedup=dedup or False,
+                **kwargs
+
+            )
+            self.store_documents(texts, batch_size=batch_size, max_retries=max_retries)
+
+        # record size, modification time, and hash of ingested files
+        for file_path in file_paths:
+            entry = self.manifest.get(file_path)
+            if entry and entry['chunk_ids']:
+                self.manifest.put(file_path, *file_info[file_path], entry['chunk_ids'])
+            elif dedup and file_path in dedup.sources:
+                # all chunks were duplicates of other files
+                self.manifest.put(file_path, *file_info[file_path], [])
+            elif entry:
+                # nothing could be loaded from file
+                self.manifest.delete(file_path)
+        for file_path, entry in changed_files + resumed_files:
+            current = self.manifest.get(file_path)
+            current = set(current['chunk_ids']) if current else set()
+            self._release_chunks(file_path, [id for id in entry['chunk_ids'] if id not in current])
+        self.store.persist()
 
         if texts:
             print(
@@ -7,9 +7,12 @@ __all__ = ['Extractor']
 
 # %% ../../nbs/04_pipelines.extractor.ipynb 3
 import os
+import glob
+import json
 from typing import List, Optional, Callable
 import pandas as pd
-from ..utils import segment
+from ..utils import segment, split_list
+from ..cache import hash_key
 
 from ..ingest import load_single_document
 
@@ -40,6 +43,10 @@ class Extractor:
               pdf_pages:List[int]=[], # If `fpath` is a PDF document, only apply prompt to text on page numbers listed in `pdf_pages` (starts at 1).
               maxchars = 2048, # units (i.e., paragraphs or sentences) larger than `maxchars` split.
               stop:list=[], # list of characters to trigger the LLM to stop generating.
+              batch_size:int=1, # Number of units sent to the LLM together with `LLM.prompt_batch`
+              max_concurrency:Optional[int]=None, # Maximum number of concurrent requests for API-based models (see `LLM.prompt_batch`)
+              checkpoint_path:Optional[str]=None, # Folder in which results are saved as Parquet files as they finish. If it already has results, extraction resumes after them.
+              checkpoint_every:int=100, # Number of results saved in each Parquet file in `checkpoint_path`
               **kwargs, # Extra kwargs are fed to `load_single_document`
              ):
         """
@@ -47,15 +54,70 @@ class Extractor:
         Extra kwargs fed directly to `load_single_document`.
         Results are stored in a `pandas.Dataframe`.
         """
+        chunks = self._segment(fpath=fpath, content=content, unit=unit, preproc_fn=preproc_fn,
+                               filter_fn=filter_fn, clean_fn=clean_fn, pdf_pages=pdf_pages,
+                               maxchars=maxchars, **kwargs)
+        if chunks is None: return
+        done = self._resume(checkpoint_path, ex_prompt_template, chunks, stop=stop)
+        rows = list(self._extract(ex_prompt_template, chunks, done, stop=stop,
+                                  batch_size=batch_size, max_concurrency=max_concurrency,
+                                  checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every))
+        df = pd.DataFrame({'Extractions':[row[1] for row in rows], 'Texts':[row[0] for row in rows]})
+        return df
+
+
+    def iter_apply(self,
+                   ex_prompt_template:str, # A prompt to apply to each `unit` in document. Should have a single variable, `{text}`
+                   fpath: Optional[str] = None, # A path to to a single file of interest (e.g., a PDF or MS Word document). Mutually-exclusive with `content`.
+                   content: Optional[str] = None, # Text content of a document of interest.  Mutually-exclusive with `fpath`.
+                   unit:str='paragraph', # One of {'sentence', 'paragraph'}.
+                   preproc_fn: Optional[Callable] = None, # Function should accept a text string and returns a new preprocessed input.
+                   filter_fn: Optional[Callable] = None, # A function that accepts a sentence or paragraph and returns `True` if prompt should be applied to it.
+                   clean_fn: Optional[Callable] = None, # A function that accepts a sentence or paragraph and returns "cleaned" version of the text. (applied after `filter_fn`)
+                   pdf_pages:List[int]=[], # If `fpath` is a PDF document, only apply prompt to text on page numbers listed in `pdf_pages` (starts at 1).
+                   maxchars = 2048, # units (i.e., paragraphs or sentences) larger than `maxchars` split.
+                   stop:list=[], # list of characters to trigger the LLM to stop generating.
+                   batch_size:int=1, # Number of units sent to the LLM together with `LLM.prompt_batch`
+                   max_concurrency:Optional[int]=None, # Maximum number of concurrent requests for API-based models (see `LLM.prompt_batch`)
+                   checkpoint_path:Optional[str]=None, # Folder in which results are saved as Parquet files as they finish. If it already has results, extraction resumes after them.
+                   checkpoint_every:int=100, # Number of results saved in each Parquet file in `checkpoint_path`
+                   **kwargs, # Extra kwargs are fed to `load_single_document`
+                  ):
+        """
+        Same as `Extractor.apply`, but returns an iterator that yields a tuple of the form `(text, extraction)` for each `unit`
+        as soon as it is finished instead of returning a `pandas.Dataframe` at the end.
+        Arguments and `checkpoint_path` are checked (and the document is loaded) when this method is called.
+        """
+        chunks = self._segment(fpath=fpath, content=content, unit=unit, preproc_fn=preproc_fn,
+                               filter_fn=filter_fn, clean_fn=clean_fn, pdf_pages=pdf_pages,
+                               maxchars=maxchars, **kwargs)
+        if chunks is None: return iter([])
+        done = self._resume(checkpoint_path, ex_prompt_template, chunks, stop=stop)
+        return self._extract(ex_prompt_template, chunks, done, stop=stop,
+                             batch_size=batch_size, max_concurrency=max_concurrency,
+                             checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every)
+
+
+    def _segment(self,
+                 fpath: Optional[str] = None,
+                 content: Optional[str] = None,
+                 unit:str='paragraph',
+                 preproc_fn: Optional[Callable] = None,
+                 filter_fn: Optional[Callable] = None,
+                 clean_fn: Optional[Callable] = None,
+                 pdf_pages:List[int]=[],
+                 maxchars = 2048,
+                 **kwargs):
+        """
+        Load and segment the document into units (filtered by `filter_fn` and cleaned by `clean_fn`).
+        Returns None if no text could be loaded from `fpath`.
+        """
         if not(bool(fpath) != bool(content)):
             raise ValueError('Either fpath argument or content argument must be supplied but not both.')
         if pdf_pages and kwargs.get('pdf_unstructured', False):
             raise ValueError('The parameters pdf_pages and pdf_unstructured are mutually exclusive.')
         if pdf_pages and kwargs.get('pdf_markdown', False):
             raise ValueError('The parameters pdf_pages and pdf_markdown are mutually exclusive.')
-            
-        # setup extraction prompt
-        extraction_prompt = ex_prompt_template if self.prompt_template is None else self.prompt_template.format(**{'prompt': ex_prompt_template})   
 
         # extract text
         if not content:
@@ -67,18 +129,82 @@ class Extractor:
             if ext == '.pdf' and pdf_pages:
                 docs = [doc for i,doc in enumerate(docs) if i+1 in pdf_pages]
             content = '\n\n'.join([preproc_fn(doc.page_content) if preproc_fn else doc.page_content for doc in docs])
-        
+
         # segment
-        chunks = segment(content, maxchars=maxchars, unit=unit)
-        extractions = []
-        texts = []
-        for chunk in chunks:
+        chunks = []
+        for chunk in segment(content, maxchars=maxchars, unit=unit):
             if filter_fn and not filter_fn(chunk): continue
             if clean_fn: chunk = clean_fn(chunk)
-            prompt = extraction_prompt.format(text=chunk)
-            extractions.append(self.llm.prompt(prompt, stop=stop))
-            texts.append(chunk)
-        df = pd.DataFrame({'Extractions':extractions, 'Texts':texts})
-        return df
-            
-        return results
+            chunks.append(chunk)
+        return chunks
+
+
+    def _extraction_prompt(self, ex_prompt_template):
+        return ex_prompt_template if self.prompt_template is None else self.prompt_template.format(**{'prompt': ex_prompt_template})
+
+
+    def _resume(self, checkpoint_path, ex_prompt_template, chunks, stop=[]):
+        """
+        Returns the `(text, extraction)` results saved in `checkpoint_path` (if supplied).
+        Raises a `ValueError` if they were produced from different text, prompt, model, or stop strings.
+        """
+        if not checkpoint_path:
+            return []
+        settings = {'key': hash_key(prompt=self._extraction_prompt(ex_prompt_template),
+                                    model_name=self.llm.model_name,
+                                    stop=stop if stop else self.llm.stop,
+                                    extra_kwargs=self.llm.extra_kwargs)}
+        settings_path = os.path.join(checkpoint_path, 'settings.json')
+        os.makedirs(checkpoint_path, exist_ok=True)
+        parts = sorted(glob.glob(os.path.join(checkpoint_path, 'part-*.parquet')))
+        if not parts:
+            with open(settings_path, 'w') as f:
+                json.dump(settings, f)
+            return []
+        saved = None
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                saved = json.load(f)
+        df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        done = list(zip(df['Texts'], df['Extractions']))
+        if saved != settings or [row[0] for row in done] != chunks[:len(done)]:
+            raise ValueError(f'The results in {checkpoint_path} are from a different document, prompt, or settings. '+\
+                             'Please supply a different checkpoint_path.')
+        return done
+
+
+    def _extract(self, ex_prompt_template, chunks, done=[], stop=[], batch_size=1, max_concurrency=None,
+                 checkpoint_path=None, checkpoint_every=100):
+        """
+        Yields `(text, extraction)` for each chunk after yielding the results in `done` (see `Extractor._resume`),
+        saving new results to `checkpoint_path` (if supplied)
+        """
+        extraction_prompt = self._extraction_prompt(ex_prompt_template)
+        yield from done
+
+        pending = []
+        num_parts = len(glob.glob(os.path.join(checkpoint_path, 'part-*.parquet'))) if checkpoint_path else 0
+        def save(rows, num_parts):
+            pd.DataFrame({'Extractions':[row[1] for row in rows], 'Texts':[row[0] for row in rows]})\
+              .to_parquet(os.path.join(checkpoint_path, f'part-{num_parts:05d}.parquet'))
+
+        try:
+            for batch in split_list(chunks[len(done):], max(batch_size, 1)):
+                prompts = [extraction_prompt.format(text=chunk) for chunk in batch]
+                if len(prompts) == 1:
+                    extractions = [self.llm.prompt(prompts[0], stop=stop)]
+                else:
+                    extractions = self.llm.prompt_batch(prompts, stop=stop, batch_size=batch_size,
+                                                        max_concurrency=max_concurrency)
+                for chunk, extraction in zip(batch, extractions):
+                    row = (chunk, extraction if isinstance(extraction, str) else extraction.content)
+                    pending.append(row)
+                    yield row
+                if checkpoint_path and len(pending) >= checkpoint_every:
+                    save(pending, num_parts)
+                    num_parts += 1
+                    pending = []
+        finally:
+            # also save finished results if interrupted
+            if checkpoint_path and pending:
+                save(pending, num_parts)
@@ -85,16 +85,20 @@ class Summarizer:
     def summarize(self, 
                   fpath:str, #  path to either a folder of documents or a single file
                   strategy:str='map_reduce', # One of {'map_reduce', 'refine'}
-                  chunk_size:int=1000, # Number of characters of each chunk to summarize
-                  chunk_overlap:int=0, # Number of characters that overlap between chunks
+                  chunk_size:int=1000, # Number of tokens (see `LLM.count_tokens`) of each chunk to summarize
+                  chunk_overlap:int=0, # Number of tokens that overlap between chunks
                   token_max:int=2000, # Maximum number of tokens to group documents into
                   max_chunks_to_use: Optional[int] = None, # Maximum number of chunks (starting from beginning) to use
+                  max_concurrency: Optional[int] = None, # If supplied, chunks in Map-Reduce are summarized together with `LLM.prompt_batch` using at most this many concurrent requests
                  ):
         """
         Summarize one or more documents (e.g., PDFs, MS Word, MS Powerpoint, plain text)
         using either Langchain's Map-Reduce strategy or Refine strategy.
         The `max_chunks` parameter may be useful for documents that have abstracts or informative introductions. 
         If `max_chunks=None`, all chunks are considered for summarizer.
+        If `max_concurrency` is supplied, the map step and each collapse level of the reduce step of the
+        Map-Reduce strategy are sent to the model all at once (see `LLM.prompt_batch`), which is much faster
+        with models served through an API (e.g., vLLM) or with Hugging Face `transformers` models.
         """
           
         if os.path.isfile(fpath):
@@ -109,7 +113,8 @@ class Summarizer:
                                       chunk_size=chunk_size, 
                                       chunk_overlap=chunk_overlap, 
                                       token_max=token_max,
-                                      max_chunks_to_use=max_chunks_to_use)
+                                      max_chunks_to_use=max_chunks_to_use,
+                                      max_concurrency=max_concurrency)
         elif strategy == 'refine':
             summary = self._refine(docs, 
                                    chunk_size=chunk_size, 
@@ -123,7 +128,7 @@ class Summarizer:
 
     
     def _map_reduce(self, docs, chunk_size=1000, chunk_overlap=0, token_max=1000, 
-                    max_chunks_to_use = None, **kwargs):
+                    max_chunks_to_use = None, max_concurrency=None, **kwargs):
         """ Map-Reduce summarization"""
         langchain_llm = self.llm.llm
 
@@ -181,14 +186,49 @@ class Summarizer:
             return_intermediate_steps=False,
         )
         
-        text_splitter = CharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        text_splitter = CharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=self.llm.count_tokens
         )
         split_docs = text_splitter.split_documents(docs)
         split_docs = split_docs[:max_chunks_to_use] if max_chunks_to_use else split_docs
 
+        if max_concurrency:
+            return self._map_reduce_batch(split_docs, token_max=token_max, max_concurrency=max_concurrency)
         return map_reduce_chain.invoke(split_docs)
 
+    def _prompt_batch(self, prompt, texts, max_concurrency=None):
+        """ Apply `prompt` to each text with `LLM.prompt_batch` and return responses in order"""
+        results = self.llm.prompt_batch([prompt.format(docs=text) for text in texts],
+                                        prompt_template=self.prompt_template,
+                                        max_concurrency=max_concurrency)
+        return [res if isinstance(res, str) else res.content for res in results]
+
+    def _map_reduce_batch(self, split_docs, token_max=1000, max_concurrency=None):
+        """ Map-Reduce summarization where each step is run with `LLM.prompt_batch`"""
+
+        def num_tokens(summaries):
+            return self.llm.count_tokens(self.reduce_prompt.format(docs='\n\n'.join(summaries)))
+
+        # Map
+        summaries = self._prompt_batch(self.map_prompt, [d.page_content for d in split_docs],
+                                       max_concurrency=max_concurrency)
+
+        # Collapse groups of summaries (in order) until they fit within token_max
+        while len(summaries) > 1 and num_tokens(summaries) > token_max:
+            groups = [[]]
+            for summary in summaries:
+                if groups[-1] and num_tokens(groups[-1] + [summary]) > token_max:
+                    groups.append([])
+                groups[-1].append(summary)
+            if any(len(group) == 1 and num_tokens(group) > token_max for group in groups):
+                raise ValueError(f'A single summary exceeds token_max ({token_max}). Try increasing token_max.')
+            summaries = self._prompt_batch(self.reduce_prompt, ['\n\n'.join(group) for group in groups],
+                                           max_concurrency=max_concurrency)
+
+        # Reduce
+        output_text = self._prompt_batch(self.reduce_prompt, ['\n\n'.join(summaries)])[0]
+        return {'input_documents': split_docs, 'output_text': output_text}
+
     def _refine(self, docs, chunk_size=1000, chunk_overlap=0, 
                 max_chunks_to_use = None, **kwargs):
         """ Refine summarization"""
@@ -226,8 +266,8 @@ class Summarizer:
             output_key="output_text",
         )
         
-        text_splitter = CharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        text_splitter = CharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=self.llm.count_tokens
         )
         split_docs = text_splitter.split_documents(docs)
         split_docs = split_docs[:max_chunks_to_use] if max_chunks_to_use else split_docs
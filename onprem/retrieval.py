@@ -0,0 +1,475 @@
+"""retrievers for `LLM.ask` and `LLM.chat`"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/08_retrieval.ipynb.
+
+# %% auto 0
+__all__ = ['BM25_NAME', 'DEFAULT_RERANKER', 'tokenize', 'BM25Index', 'reciprocal_rank_fusion', 'HybridRetriever',
+           'CrossEncoderReranker', 'RerankingRetriever', 'CachedRetriever', 'ContextPacker', 'PackingRetriever']
+
+# %% ../nbs/08_retrieval.ipynb 3
+import os
+import re
+import math
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .utils import get_datadir
+from .cache import LRUCache, hash_key
+
+# %% ../nbs/08_retrieval.ipynb 4
+BM25_NAME = 'bm25.sqlite'
+
+def tokenize(text:str) -> List[str]:
+    """
+    Lowercases `text` and splits it into words. Identifiers joined by '-', '.', '/', or '_'
+    (e.g., part numbers like `AB-1234.5`) are kept as a single token in addition to their parts.
+    """
+    tokens = []
+    for token in re.findall(r'\w+(?:[-./]\w+)*', text.lower()):
+        tokens.append(token)
+        parts = re.findall(r'[^\W_]+', token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, path:str, k1:float=1.5, b:float=0.75, max_df:float=0.5):
+        """
+        Persistent inverted index of chunks for keyword search with [BM25](https://en.wikipedia.org/wiki/Okapi_BM25)
+        stored in a SQLite database.
+
+        **Args:**
+
+        - *path*: Path to the SQLite database file (created if it doesn't exist)
+        - *k1*: BM25 term frequency saturation
+        - *b*: BM25 document length normalization
+        - *max_df*: Query terms found in more than this fraction of chunks (e.g., stop words) are ignored
+                    unless all query terms are that frequent
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, length INTEGER NOT NULL)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, id TEXT NOT NULL, '
+                               'tf INTEGER NOT NULL, PRIMARY KEY (term, id)) WITHOUT ROWID')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS postings_id ON postings (id)')
+            self._count, self._total_length = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs').fetchone()
+
+    def add(self, ids:List[str], texts:List[str]):
+        """
+        Adds chunks to the index (replacing chunks with the same IDs)
+        """
+        self.delete(ids)
+        docs = {id: Counter(tokenize(text)) for id, text in zip(ids, texts)}
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT INTO docs VALUES (?, ?)',
+                                   [(id, sum(terms.values())) for id, terms in docs.items()])
+            self._conn.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                                   [(term, id, tf) for id, terms in docs.items() for term, tf in terms.items()])
+            self._count += len(docs)
+            self._total_length += sum(sum(terms.values()) for terms in docs.values())
+
+    def delete(self, ids:List[str]):
+        """
+        Removes chunks from the index
+        """
+        with self._lock, self._conn:
+            for i in range(0, len(ids), 900):
+                lst = ids[i:i + 900]
+                params = ",".join("?" * len(lst))
+                count, length = self._conn.execute(
+                    f'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE id IN ({params})', lst).fetchone()
+                if not count:
+                    continue
+                self._conn.execute(f'DELETE FROM postings WHERE id IN ({params})', lst)
+                self._conn.execute(f'DELETE FROM docs WHERE id IN ({params})', lst)
+                self._count -= count
+                self._total_length -= length
+
+    def search(self, query:str, k:int=4) -> List[Tuple[str, float]]:
+        """
+        Returns the IDs and BM25 scores of the `k` chunks best matching `query`
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not self._count or not terms:
+                return []
+            dfs = {term: self._conn.execute('SELECT COUNT(*) FROM postings WHERE term = ?', (term,)).fetchone()[0]
+                   for term in terms}
+            dfs = {term: df for term, df in dfs.items() if df}
+            rare = {term: df for term, df in dfs.items() if df <= self.max_df * self._count}
+            avg_length = self._total_length / self._count
+            scores = Counter()
+            for term, df in (rare or dfs).items():
+                idf = math.log(1 + (self._count - df + 0.5) / (df + 0.5))
+                for id, tf, length in self._conn.execute(
+                        'SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON p.id = d.id WHERE p.term = ?', (term,)):
+                    scores[id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+        return scores.most_common(k)
+
+    def clear(self):
+        """
+        Removes all chunks
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM postings')
+            self._conn.execute('DELETE FROM docs')
+            self._count, self._total_length = 0, 0
+
+    def __len__(self):
+        return self._count
+
+# %% ../nbs/08_retrieval.ipynb 7
+def reciprocal_rank_fusion(rankings:List[List[str]], k:int=60) -> List[Tuple[str, float]]:
+    """
+    Combines rankings of IDs with [reciprocal-rank fusion](https://plg.uwaterloo.ca/~gvcormac/cormacksigir09-rrf.pdf).
+    Returns `(id, score)` tuples sorted by descending score.
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, id in enumerate(ranking):
+            scores[id] += 1 / (k + rank + 1)
+    return scores.most_common()
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever combining vector search (of an `onprem.vectorstore.VectorStoreBase`) with
+    keyword search (of a `BM25Index`) using reciprocal-rank fusion.
+    `fetch_k` chunks are retrieved with each method and the best `k` chunks are returned.
+    Only chunks found with vector search are subject to `score_threshold`.
+    """
+    store: Any
+    embeddings: Any
+    sparse_index: Any
+    k: int = 4
+    score_threshold: float = 0.0
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query:str, *, run_manager:CallbackManagerForRetrieverRun) -> List[Document]:
+        results = self.store.query(self.embeddings.embed_query(query), k=self.fetch_k)
+        docs = {id: Document(id=id, page_content=document, metadata=metadata or {})
+                for id, document, metadata, distance
+                in zip(results['ids'], results['documents'], results['metadatas'], results['distances'])
+                if 1 - distance >= self.score_threshold}
+        dense = list(docs)
+        sparse = [id for id, _ in self.sparse_index.search(query, k=self.fetch_k)]
+        ids = [id for id, _ in reciprocal_rank_fusion([dense, sparse], k=self.rrf_k)[:self.k]]
+        missing = [id for id in ids if id not in docs]
+        if missing:
+            results = self.store.get(ids=missing, include=['documents', 'metadatas'])
+            for id, document, metadata in zip(results['ids'], results['documents'], results['metadatas']):
+                docs[id] = Document(id=id, page_content=document, metadata=metadata or {})
+        return [docs[id] for id in ids if id in docs]
+
+# %% ../nbs/08_retrieval.ipynb 8
+DEFAULT_RERANKER = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+class CrossEncoderReranker:
+    def __init__(self,
+                 model_name:str=DEFAULT_RERANKER,
+                 backend:str='torch',
+                 batch_size:int=32,
+                 max_length:int=512,
+                 cache_size:int=10000,
+                 quantize:bool=True,
+                 onnx_path:Optional[str]=None):
+        """
+        Scores (query, chunk) pairs with a cross-encoder, which is more accurate than vector search
+        but too slow to apply to more than a few dozen candidate chunks per query.
+        Scores are computed in batches and cached by query and chunk ID.
+
+        **Args:**
+
+        - *model_name*: Name of a Hugging Face cross-encoder (sequence classification) model or path to an ONNX model
+                        (ending in `.onnx`, with its tokenizer in the same folder)
+        - *backend*: One of {'torch', 'onnx'}. If 'onnx', the model is run with ONNX Runtime using `onprem.hf.models.onnx.OnnxModel`
+                     (models are exported with `onprem.hf.train.hfonnx.HFOnnx` on first use).
+        - *batch_size*: Number of pairs scored at a time
+        - *max_length*: Maximum number of tokens in a pair (longer chunks are truncated)
+        - *cache_size*: Number of scores kept in memory
+        - *quantize*: If True, exported ONNX models are quantized to int8
+        - *onnx_path*: Where to save exported ONNX models. Default is `onprem_data/onnx_models/<model_name>/model-int8.onnx`
+                       in user's home directory.
+        """
+        from transformers import AutoTokenizer
+
+        if backend not in ['torch', 'onnx']:
+            raise ValueError("backend must be one of {'torch', 'onnx'}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = LRUCache(cache_size)
+        if backend == 'onnx' or model_name.endswith('.onnx'):
+            from onprem.hf.models.onnx import OnnxModel
+            from onprem.ingest import ONNX_MODELS
+
+            path = model_name
+            if not model_name.endswith('.onnx'):
+                path = onnx_path or os.path.join(get_datadir(), ONNX_MODELS, model_name.replace('/', '--'),
+                                                 'model-int8.onnx' if quantize else 'model.onnx')
+                if not os.path.isfile(path):
+                    self.export(model_name, path, quantize=quantize)
+            self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(os.path.abspath(path)))
+            self.model = OnnxModel(path)
+        else:
+            from transformers import AutoModelForSequenceClassification
+
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            self.model.eval()
+            max_length = min(max_length, getattr(self.model.config, 'max_position_embeddings', max_length))
+        self.max_length = min(max_length, self.tokenizer.model_max_length)
+
+    @staticmethod
+    def export(model_name:str, path:str, quantize:bool=True):
+        """
+        Exports the cross-encoder `model_name` to an ONNX model at `path` and saves its tokenizer in the same folder.
+        Returns `path`.
+        """
+        from transformers import AutoConfig, AutoTokenizer
+        from onprem.hf.train.hfonnx import HFOnnx
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        print(f"Exporting {model_name} to {path}...")
+        HFOnnx()(model_name, task='text-classification', output=path, quantize=quantize)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        maxlength = getattr(AutoConfig.from_pretrained(model_name), 'max_position_embeddings', None)
+        if maxlength:
+            tokenizer.model_max_length = min(tokenizer.model_max_length, maxlength)
+        tokenizer.save_pretrained(folder)
+        return path
+
+    def _predict(self, query:str, texts:List[str]):
+        import torch
+
+        scores = []
+        for i in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer([query] * len(texts[i:i + self.batch_size]), texts[i:i + self.batch_size],
+                                    padding=True, truncation='only_second', max_length=self.max_length,
+                                    return_tensors='pt')
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            # models with two labels output the logits of (irrelevant, relevant)
+            logits = logits[:, 0] if logits.shape[1] == 1 else logits.softmax(-1)[:, 1]
+            scores.extend(logits.tolist())
+        return scores
+
+    def score(self, query:str, documents:List[Document]) -> List[float]:
+        """
+        Returns the relevance score of each document to `query` (higher is more relevant)
+        """
+        keys = [(query, doc.id or hash_key(text=doc.page_content)) for doc in documents]
+        scores = [self.cache.get(key) for key in keys]
+        missing = {key: doc.page_content for key, doc, score in zip(keys, documents, scores) if score is None}
+        if missing:
+            for key, score in zip(missing, self._predict(query, list(missing.values()))):
+                self.cache.set(key, score)
+            scores = [self.cache.get(key, score) if score is None else score for key, score in zip(keys, scores)]
+        return scores
+
+    def rerank(self, query:str, documents:List[Document], k:Optional[int]=None) -> List[Document]:
+        """
+        Returns the `k` documents most relevant to `query` sorted by relevance
+        """
+        scores = self.score(query, documents)
+        order = sorted(range(len(documents)), key=lambda i: -scores[i])
+        return [documents[i] for i in order[:k]]
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Retriever that reranks the chunks found by `retriever` with a `CrossEncoderReranker` and returns the best `k`
+    """
+    retriever: BaseRetriever
+    reranker: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query:str, *, run_manager:CallbackManagerForRetrieverRun) -> List[Document]:
+        documents = self.retriever.invoke(query, config={'callbacks': run_manager.get_child()})
+        return self.reranker.rerank(query, documents, k=self.k)
+
+# %% ../nbs/08_retrieval.ipynb 10
+class CachedRetriever(BaseRetriever):
+    """
+    Retriever that returns the sources previously retrieved by `retriever` for the same question
+    from `cache` (an `onprem.cache.RetrievalCache`), as long as `version()` is unchanged.
+    """
+    retriever: BaseRetriever
+    cache: Any
+    version: Optional[Callable] = None
+
+    def _get_relevant_documents(self, query:str, *, run_manager:CallbackManagerForRetrieverRun) -> List[Document]:
+        version = self.version() if self.version else None
+        documents = self.cache.get(query, version=version)
+        if documents is None:
+            documents = self.retriever.invoke(query, config={'callbacks': run_manager.get_child()})
+            self.cache.set(query, documents, version=version)
+        return documents
+
+# %% ../nbs/08_retrieval.ipynb 11
+def _chunk_ordinal(document:Document) -> Optional[int]:
+    """
+    Returns the position of a chunk among the chunks of its source from its ID (see `onprem.ingest.chunk_id`)
+    """
+    match = re.match(r'^[0-9a-f]{16}-(\d+)-[0-9a-f]{16}$', document.id or '')
+    return int(match.group(1)) if match else None
+
+
+def _text_overlap(a:str, b:str, min_overlap:int) -> int:
+    """
+    Returns the length of the longest suffix of `a` that is a prefix of `b` (0 if shorter than `min_overlap`)
+    """
+    head = b[:min_overlap]
+    pos = a.find(head, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(head, pos + 1)
+    return 0
+
+
+class ContextPacker:
+    def __init__(self,
+                 count_tokens:Callable[[str], int],
+                 merge:bool=True,
+                 trim:bool=True,
+                 min_trim_tokens:int=32,
+                 min_overlap:int=8,
+                 separator:str='\n\n'):
+        """
+        Packs ranked sources into a context of at most a given number of tokens.
+
+        **Args:**
+
+        - *count_tokens*: Function returning the number of tokens in a string (e.g., using the model's tokenizer)
+        - *merge*: If True, adjacent chunks from the same source are merged into one source (dropping text they share
+                   due to chunk overlap). Chunks are adjacent if their IDs have consecutive positions
+                   (see `onprem.ingest.chunk_id`) or if one ends with the start of the other.
+        - *trim*: If True, the highest-ranked source that does not fit is truncated to fill the remaining tokens
+        - *min_trim_tokens*: Sources are only truncated if at least this many tokens remain
+        - *min_overlap*: Minimum number of characters shared by chunks for them to be considered adjacent
+        - *separator*: String separating sources in the context (`"\n\n"` for `langchain` "stuff" chains)
+        """
+        self.count_tokens = count_tokens
+        self.merge = merge
+        self.trim = trim
+        self.min_trim_tokens = min_trim_tokens
+        self.min_overlap = min_overlap
+        self.separator = separator
+
+    def _join(self, a:Document, b:Document) -> Optional[str]:
+        """
+        Returns the text of `a` followed by `b` if `b` directly follows `a` in their source (or None)
+        """
+        if a.metadata.get('source') != b.metadata.get('source'):
+            return None
+        overlap = _text_overlap(a.page_content, b.page_content, self.min_overlap)
+        if overlap:
+            return a.page_content + b.page_content[overlap:]
+        ordinal_a, ordinal_b = _chunk_ordinal(a), _chunk_ordinal(b)
+        if ordinal_a is not None and ordinal_b == ordinal_a + 1:
+            return a.page_content + '\n' + b.page_content
+        return None
+
+    def _add(self, groups:List[List[Document]], document:Document) -> List[List[Document]]:
+        """
+        Returns `groups` (lists of adjacent chunks) with `document` added as a new group,
+        combining groups that have become adjacent (at the rank of the better group)
+        """
+        groups = groups + [[document]]
+        while self.merge:
+            pairs = [(i, j) for i in range(len(groups)) for j in range(len(groups))
+                     if i != j and self._join(groups[i][-1], groups[j][0]) is not None]
+            if not pairs:
+                break
+            i, j = pairs[0]
+            combined = groups[i] + groups[j]
+            groups = [group for k, group in enumerate(groups) if k not in (i, j)]
+            groups.insert(min(i, j), combined)
+        return groups
+
+    def _merge(self, group:List[Document]) -> Document:
+        """
+        Merges adjacent chunks into one `Document` with the ID and metadata of the first chunk
+        """
+        document = group[0]
+        for other in group[1:]:
+            document = Document(id=group[0].id, page_content=self._join(document, other) or
+                                document.page_content + '\n' + other.page_content,
+                                metadata=group[0].metadata)
+        return document
+
+    def _context(self, groups:List[List[Document]]) -> List[Document]:
+        return [self._merge(group) for group in groups]
+
+    def _num_tokens(self, documents:List[Document]) -> int:
+        return self.count_tokens(self.separator.join(doc.page_content for doc in documents))
+
+    def _truncate(self, groups:List[List[Document]], document:Document, max_tokens:int) -> Optional[List[List[Document]]]:
+        """
+        Returns `groups` with the longest prefix of `document` that fits in `max_tokens` (or None if none fits)
+        """
+        lo, hi = 0, len(document.page_content)
+        best = None
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            text = document.page_content[:mid]
+            text = text[:text.rfind(' ')] if ' ' in text else text
+            candidate = self._add(groups, Document(id=document.id, page_content=text, metadata=document.metadata))
+            if self._num_tokens(self._context(candidate)) <= max_tokens:
+                best = candidate if text.strip() else best
+                lo = mid
+            else:
+                hi = mid - 1
+        return best
+
+    def pack(self, documents:List[Document], max_tokens:int) -> List[Document]:
+        """
+        Returns as many of `documents` (ordered from most to least relevant) as fit in `max_tokens` tokens
+        when joined with `separator`. Merged sources are placed at the rank of their best chunk.
+        """
+        groups = []
+        for document in documents:
+            candidate = self._add(groups, document)
+            if self._num_tokens(self._context(candidate)) <= max_tokens:
+                groups = candidate
+                continue
+            if self.trim:
+                remaining = max_tokens - self._num_tokens(self._context(groups) +
+                                                          [Document(page_content='')])
+                if remaining >= self.min_trim_tokens:
+                    groups = self._truncate(groups, document, max_tokens) or groups
+                    break
+        return self._context(groups)
+
+
+class PackingRetriever(BaseRetriever):
+    """
+    Retriever that packs the sources returned by `retriever` with `packer` (a `ContextPacker`) so that the prompt
+    built from `prompt_template` (with variables "context" and "question") has at most `max_prompt_tokens` tokens
+    (an integer or a function returning one)
+    """
+    retriever: BaseRetriever
+    packer: Any
+    prompt_template: str
+    max_prompt_tokens: Any
+
+    def _get_relevant_documents(self, query:str, *, run_manager:CallbackManagerForRetrieverRun) -> List[Document]:
+        documents = self.retriever.invoke(query, config={'callbacks': run_manager.get_child()})
+        max_prompt_tokens = self.max_prompt_tokens() if callable(self.max_prompt_tokens) else self.max_prompt_tokens
+        overhead = self.packer.count_tokens(self.prompt_template.format(context='', question=query))
+        return self.packer.pack(documents, max(max_prompt_tokens - overhead, 0))
@@ -0,0 +1,703 @@
+"""vector database backends for `onprem`"""
+
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/07_vectorstore.ipynb.
+
+# %% auto 0
+__all__ = ['CHROMA_COLLECTION', 'STORE_BACKENDS', 'VectorStoreBase', 'ChromaStore', 'LocalStoreBase', 'HNSWStore',
+           'QuantizedStore', 'VectorDB', 'get_store']
+
+# %% ../nbs/07_vectorstore.ipynb 3
+import os
+import json
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Iterable
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .cache import open_memmap
+
+# %% ../nbs/07_vectorstore.ipynb 4
+class VectorStoreBase(ABC):
+    """
+    Base class for vector stores holding the chunks ingested by `onprem.ingest.Ingester`.
+    Methods follow the Chroma collection API and results are dictionaries of lists keyed by
+    `ids`, `documents`, `metadatas`, and `embeddings` (or `distances` for `query`).
+    Distances are cosine distances (i.e., 1 - cosine similarity).
+    """
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Returns the number of stored chunks
+        """
+        pass
+
+    @abstractmethod
+    def get(self, ids:Optional[List[str]]=None, where:Optional[dict]=None, limit:Optional[int]=None,
+            offset:Optional[int]=None, include:List[str]=['metadatas', 'documents']) -> dict:
+        """
+        Returns chunks by ID (or all chunks if `ids` is None) whose metadata matches `where`.
+        Only IDs plus the fields in `include` are returned.
+        """
+        pass
+
+    @abstractmethod
+    def upsert(self, ids:List[str], embeddings:List[List[float]], metadatas:List[Optional[dict]], documents:List[str]):
+        """
+        Adds chunks (replacing chunks with the same IDs)
+        """
+        pass
+
+    @abstractmethod
+    def update(self, ids:List[str], metadatas:List[Optional[dict]]):
+        """
+        Replaces the metadata of stored chunks
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, ids:List[str]):
+        """
+        Deletes chunks by ID
+        """
+        pass
+
+    @abstractmethod
+    def query(self, embedding:List[float], k:int=4, where:Optional[dict]=None) -> dict:
+        """
+        Returns the `k` chunks nearest to `embedding` whose metadata matches `where`
+        """
+        pass
+
+    def as_langchain(self, embeddings:Embeddings) -> VectorStore:
+        """
+        Returns a LangChain `VectorStore` for this store (e.g., for use with `as_retriever`)
+        """
+        return VectorDB(self, embeddings)
+
+    def persist(self):
+        """
+        Writes pending changes to disk
+        """
+        pass
+
+# %% ../nbs/07_vectorstore.ipynb 5
+CHROMA_COLLECTION = "onprem_chroma"
+
+class ChromaStore(VectorStoreBase):
+    def __init__(self, persist_directory:str, collection_name:str=CHROMA_COLLECTION):
+        """
+        Vector store backed by a persistent Chroma collection
+        """
+        import chromadb
+        from chromadb.config import Settings
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.settings = Settings(persist_directory=persist_directory, anonymized_telemetry=False)
+        self.client = chromadb.PersistentClient(settings=self.settings, path=persist_directory)
+        self.collection = self.client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+
+    def count(self):
+        return self.collection.count()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=['metadatas', 'documents']):
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def query(self, embedding, k=4, where=None):
+        results = self.collection.query(query_embeddings=[embedding], n_results=k, where=where,
+                                        include=['metadatas', 'documents', 'distances'])
+        return {key: results[key][0] for key in ['ids', 'documents', 'metadatas', 'distances']}
+
+    def as_langchain(self, embeddings):
+        from langchain_chroma import Chroma
+        return Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=embeddings,
+            client_settings=self.settings,
+            client=self.client,
+            collection_metadata={"hnsw:space": "cosine"},
+            collection_name=self.collection_name,
+        )
+
+# %% ../nbs/07_vectorstore.ipynb 6
+class LocalStoreBase(VectorStoreBase):
+    """
+    Base class for in-process vector stores. Embeddings are stored as rows of a memory-mapped float32 matrix,
+    while chunk texts and metadata are stored in a separate SQLite database.
+    Subclasses implement the search index over the rows of the matrix.
+    Rows of deleted chunks are not reused.
+    """
+    NAME = None
+
+    def __init__(self, persist_directory:str, initial_capacity:int=1024):
+        self.persist_directory = persist_directory
+        self.path = os.path.join(persist_directory, self.NAME)
+        os.makedirs(self.path, exist_ok=True)
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._matrix_path = os.path.join(self.path, 'embeddings.f32')
+        self._conn = sqlite3.connect(os.path.join(self.path, 'chunks.sqlite'), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, '
+                               'document TEXT, metadata TEXT)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._count = self._conn.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+            self._info = dict(self._conn.execute('SELECT name, value FROM info').fetchall())
+        self.dim = int(self._info['dim']) if 'dim' in self._info else None
+        self._rows = int(self._info.get('rows', 0)) # number of rows ever allocated
+        self._matrix = None
+
+    def _load(self):
+        """
+        Opens the embedding matrix and index (called by subclass constructors once settings are set)
+        """
+        if self.dim is not None:
+            self._open_matrix()
+            self._open_index(rebuild=self._info.get('dirty') == '1')
+
+    def _set_info(self, **kwargs):
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO info VALUES (?, ?)', [(k, str(v)) for k, v in kwargs.items()])
+
+    def _open_matrix(self, capacity:Optional[int]=None):
+        """
+        Memory-maps the embedding matrix, growing the file to `capacity` rows if necessary
+        """
+        self._matrix = open_memmap(self._matrix_path, self._matrix, np.float32, self.dim, capacity)
+
+    def _stored_rows(self):
+        """
+        Returns the rows of all stored chunks
+        """
+        return [row for (row,) in self._conn.execute('SELECT row FROM chunks ORDER BY row')]
+
+    @abstractmethod
+    def _open_index(self, rebuild:bool=False):
+        """
+        Loads the index from disk (or rebuilds it from the embedding matrix)
+        """
+        pass
+
+    @abstractmethod
+    def _resize_index(self, capacity:int):
+        """
+        Grows the index to hold `capacity` rows
+        """
+        pass
+
+    @abstractmethod
+    def _add_to_index(self, rows:List[int], embeddings:np.ndarray):
+        """
+        Adds (or replaces) the embeddings of `rows` in the index
+        """
+        pass
+
+    @abstractmethod
+    def _delete_from_index(self, rows:List[int]):
+        """
+        Removes `rows` from the index
+        """
+        pass
+
+    @abstractmethod
+    def _search(self, embedding:np.ndarray, k:int, allowed:Optional[set]=None):
+        """
+        Returns the rows of the `k` nearest chunks (restricted to `allowed` rows) and their cosine distances
+        """
+        pass
+
+    @abstractmethod
+    def _save_index(self):
+        """
+        Writes the index to disk
+        """
+        pass
+
+    def count(self):
+        return self._count
+
+    def _where(self, where:Optional[dict]):
+        """
+        Returns SQL condition and parameters selecting chunks whose metadata equals `where`
+        """
+        if not where:
+            return '1', []
+        return ' AND '.join('json_extract(metadata, ?) = ?' for _ in where), \
+               [v for key, value in where.items() for v in (f'$.{key}', value)]
+
+    def _results(self, rows, include):
+        results = {'ids': [row[0] for row in rows]}
+        results['embeddings'] = None
+        if 'embeddings' in include:
+            results['embeddings'] = self._matrix[[row[1] for row in rows]].tolist() if rows else []
+        results['documents'] = [row[2] for row in rows] if 'documents' in include else None
+        results['metadatas'] = [json.loads(row[3]) if row[3] else None for row in rows] if 'metadatas' in include else None
+        return results
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=['metadatas', 'documents']):
+        condition, params = self._where(where)
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute(f'SELECT id, row, document, metadata FROM chunks WHERE {condition} '
+                                          'ORDER BY row LIMIT ? OFFSET ?',
+                                          params + [-1 if limit is None else limit, offset or 0]).fetchall()
+            else:
+                rows = []
+                for i in range(0, len(ids), 900):
+                    lst = ids[i:i + 900]
+                    rows.extend(self._conn.execute(
+                        f'SELECT id, row, document, metadata FROM chunks WHERE id IN ({",".join("?" * len(lst))}) '
+                        f'AND {condition}', lst + params).fetchall())
+            return self._results(rows, include)
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        if not ids:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                self._set_info(dim=self.dim)
+                self._open_matrix(self.initial_capacity)
+                self._open_index(rebuild=True)
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f'Expected embeddings of dimension {self.dim} but got {embeddings.shape[1]}.')
+            # chunks with the same ID as a stored chunk are written to the row of the stored chunk
+            rows = {}
+            for i in range(0, len(ids), 900):
+                lst = ids[i:i + 900]
+                rows.update(self._conn.execute(
+                    f'SELECT id, row FROM chunks WHERE id IN ({",".join("?" * len(lst))})', lst).fetchall())
+            num_new = 0
+            for id in ids:
+                if id not in rows:
+                    rows[id] = self._rows + num_new
+                    num_new += 1
+            if self._rows + num_new > self._matrix.shape[0]:
+                capacity = max(2 * self._matrix.shape[0], self._rows + num_new)
+                self._open_matrix(capacity)
+                self._resize_index(capacity)
+            lst = [rows[id] for id in ids]
+            self._matrix[lst] = embeddings
+            self._matrix.flush()
+            self._rows += num_new
+            self._set_info(rows=self._rows, dirty=1)
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)',
+                                       [(id, rows[id], document, json.dumps(metadata) if metadata else None)
+                                        for id, document, metadata in zip(ids, documents, metadatas)])
+            self._count += num_new
+            self._add_to_index(lst, embeddings)
+
+    def update(self, ids, metadatas):
+        with self._lock, self._conn:
+            self._conn.executemany('UPDATE chunks SET metadata = ? WHERE id = ?',
+                                   [(json.dumps(metadata) if metadata else None, id) for id, metadata in zip(ids, metadatas)])
+
+    def delete(self, ids):
+        with self._lock:
+            rows = []
+            for i in range(0, len(ids), 900):
+                lst = ids[i:i + 900]
+                rows.extend(row for (row,) in self._conn.execute(
+                    f'SELECT row FROM chunks WHERE id IN ({",".join("?" * len(lst))})', lst))
+            if not rows:
+                return
+            self._set_info(dirty=1)
+            with self._conn:
+                self._conn.executemany('DELETE FROM chunks WHERE row = ?', [(row,) for row in rows])
+            self._delete_from_index(rows)
+            self._count -= len(rows)
+
+    def query(self, embedding, k=4, where=None):
+        empty = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        with self._lock:
+            if not self._count:
+                return empty
+            allowed = None
+            if where:
+                condition, params = self._where(where)
+                allowed = {row for (row,) in self._conn.execute(f'SELECT row FROM chunks WHERE {condition}', params)}
+            k = min(k, self._count if allowed is None else len(allowed))
+            if not k:
+                return empty
+            labels, distances = self._search(np.asarray(embedding, dtype=np.float32), k, allowed)
+            rows = dict((row[1], row) for row in self._conn.execute(
+                f'SELECT id, row, document, metadata FROM chunks WHERE row IN ({",".join("?" * len(labels))})', labels))
+        results = self._results([rows[label] for label in labels], ['documents', 'metadatas'])
+        results['distances'] = distances
+        del results['embeddings']
+        return results
+
+    def persist(self):
+        with self._lock:
+            if self.dim is None:
+                return
+            self._save_index()
+            self._set_info(dirty=0)
+
+
+class HNSWStore(LocalStoreBase):
+    NAME = "hnsw"
+
+    def __init__(self,
+                 persist_directory:str,
+                 M:int=16,
+                 ef_construction:int=200,
+                 ef_search:int=64,
+                 initial_capacity:int=1024):
+        """
+        In-process vector store using an `hnswlib` HNSW index for search.
+        Embeddings are stored as rows of a memory-mapped float32 matrix, while chunk texts and metadata
+        are stored in a separate SQLite database, so only the HNSW graph is held in memory.
+        The index is saved to disk by `persist`. If the process exits before then, the index is rebuilt from
+        the embedding matrix the next time the store is opened.
+
+        **Args:**
+
+        - *persist_directory*: Path to folder storing the index (created if it doesn't exist)
+        - *M*: Number of neighbors of each node in the HNSW graph (higher is more accurate but uses more memory)
+        - *ef_construction*: Size of candidate list when building the index (higher is more accurate but slower)
+        - *ef_search*: Size of candidate list when searching (higher is more accurate but slower)
+        - *initial_capacity*: Number of rows allocated when the index is first created. Capacity doubles when full.
+        """
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError('Please install hnswlib: pip install hnswlib')
+        self._hnswlib = hnswlib
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = None
+        super().__init__(persist_directory, initial_capacity=initial_capacity)
+        self._index_path = os.path.join(self.path, 'index.bin')
+        self._load()
+
+    def _open_index(self, rebuild=False):
+        self.index = self._hnswlib.Index(space='cosine', dim=self.dim)
+        capacity = max(self.initial_capacity, self._matrix.shape[0])
+        if rebuild or not os.path.exists(self._index_path):
+            self.index.init_index(max_elements=capacity, M=self.M, ef_construction=self.ef_construction)
+            rows = self._stored_rows()
+            for i in range(0, len(rows), 10000):
+                self.index.add_items(self._matrix[rows[i:i + 10000]], rows[i:i + 10000])
+            self.persist()
+        else:
+            self.index.load_index(self._index_path, max_elements=capacity)
+        self.index.set_ef(self.ef_search)
+
+    def _resize_index(self, capacity):
+        self.index.resize_index(capacity)
+
+    def _add_to_index(self, rows, embeddings):
+        self.index.add_items(embeddings, rows)
+
+    def _delete_from_index(self, rows):
+        for row in rows:
+            self.index.mark_deleted(row)
+
+    def _search(self, embedding, k, allowed=None):
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(embedding[None], k=k,
+                                                 filter=None if allowed is None else allowed.__contains__)
+        return labels[0].tolist(), distances[0].tolist()
+
+    def _save_index(self):
+        self.index.save_index(self._index_path)
+
+# %% ../nbs/07_vectorstore.ipynb 8
+class QuantizedStore(LocalStoreBase):
+    NAME = "quantized"
+
+    def __init__(self,
+                 persist_directory:str,
+                 quantization:str='int8',
+                 num_subvectors:Optional[int]=None,
+                 rescore:int=4,
+                 train_size:int=10000,
+                 block_size:int=16384,
+                 initial_capacity:int=1024):
+        """
+        In-process vector store for low-memory retrieval. Quantized embeddings are stored in a memory-mapped file
+        and scanned in blocks, so neither the embeddings nor an index graph need to be held in memory.
+        The nearest candidates are optionally re-scored with the float32 embeddings (also memory-mapped).
+
+        **Args:**
+
+        - *persist_directory*: Path to folder storing the index (created if it doesn't exist)
+        - *quantization*: One of {'int8', 'pq'}. With 'int8', each dimension is stored in one byte (4x smaller than float32).
+                          With 'pq' (product quantization), each embedding is stored as the one-byte ID of its nearest
+                          coarse centroid plus, for each group of `dim/num_subvectors` dimensions, the one-byte ID of the
+                          centroid nearest to its residual.
+        - *num_subvectors*: Number of subvectors (i.e., bytes per embedding besides the coarse centroid) when `quantization='pq'`.
+                            Must divide the embedding dimension. Default is one subvector for every 8 dimensions.
+        - *rescore*: Re-score `rescore * k` candidates with float32 embeddings when searching for `k` chunks.
+                     If 0, distances are computed from quantized embeddings only.
+        - *train_size*: Number of embeddings sampled to train product quantization centroids. Centroids are trained
+                        once this many chunks are stored (search is exact until then).
+        - *block_size*: Number of quantized embeddings scanned at a time
+        - *initial_capacity*: Number of rows allocated when the index is first created. Capacity doubles when full.
+        """
+        if quantization not in ['int8', 'pq']:
+            raise ValueError("quantization must be one of {'int8', 'pq'}")
+        self.quantization = quantization
+        self.num_subvectors = num_subvectors
+        self.rescore = rescore
+        self.train_size = train_size
+        self.block_size = block_size
+        self.coarse = None
+        self.codebooks = None
+        self._codes = None
+        self._scales = None
+        self._valid = None
+        super().__init__(persist_directory, initial_capacity=initial_capacity)
+        self._codes_path = os.path.join(self.path, f'codes-{quantization}.u8')
+        self._scales_path = os.path.join(self.path, 'scales.f32')
+        self._codebooks_path = os.path.join(self.path, 'codebooks.npz')
+        self._load()
+
+    def _code_size(self):
+        if self.quantization == 'int8':
+            return self.dim
+        return self._num_subvectors() + 1
+
+    def _num_subvectors(self):
+        if self.codebooks is not None:
+            return self.codebooks.shape[0]
+        m = self.num_subvectors or max(1, self.dim // 8)
+        if self.dim % m:
+            raise ValueError(f'num_subvectors must divide the embedding dimension ({self.dim}).')
+        return m
+
+    def _open_index(self, rebuild=False):
+        if self.quantization == 'pq' and os.path.exists(self._codebooks_path):
+            with np.load(self._codebooks_path) as f:
+                self.coarse, self.codebooks = f['coarse'], f['codebooks']
+        rebuild = rebuild or not os.path.exists(self._codes_path)
+        self._resize_index(self._matrix.shape[0])
+        rows = self._stored_rows()
+        self._valid[:] = False
+        self._valid[rows] = True
+        if rebuild:
+            self._encode_rows(rows)
+            self.persist()
+
+    def _resize_index(self, capacity):
+        dtype = np.int8 if self.quantization == 'int8' else np.uint8
+        self._codes = open_memmap(self._codes_path, self._codes, dtype, self._code_size(), capacity)
+        if self.quantization == 'int8':
+            self._scales = open_memmap(self._scales_path, self._scales, np.float32, 1, capacity)
+        valid = np.zeros(capacity, dtype=bool)
+        if self._valid is not None:
+            valid[:len(self._valid)] = self._valid
+        self._valid = valid
+
+    def _encode_rows(self, rows:List[int]):
+        for i in range(0, len(rows), self.block_size):
+            lst = rows[i:i + self.block_size]
+            self._add_to_index(lst, self._matrix[lst])
+
+    def _add_to_index(self, rows, embeddings):
+        vectors = _normalize(embeddings)
+        if self.quantization == 'int8':
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+            self._codes[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[rows, 0] = scales
+            self._scales.flush()
+        elif self.codebooks is not None:
+            self._codes[rows] = self._pq_encode(vectors)
+        self._codes.flush()
+        self._valid[rows] = True
+        if self.quantization == 'pq' and self.codebooks is None and self._count >= self.train_size:
+            self._train()
+
+    def _delete_from_index(self, rows):
+        self._valid[rows] = False
+
+    def _train(self):
+        """
+        Trains coarse and product quantization centroids on a sample of stored embeddings and encodes all stored embeddings
+        """
+        rows = self._stored_rows()
+        rng = np.random.default_rng(42)
+        sample = np.sort(rng.choice(rows, min(len(rows), self.train_size), replace=False))
+        vectors = _normalize(self._matrix[sample])
+        coarse = _kmeans(vectors, min(256, len(vectors)))
+        residuals = vectors - coarse[_nearest(vectors, coarse)]
+        codebooks = [_kmeans(sub, min(256, len(sub))) for sub in np.split(residuals, self._num_subvectors(), axis=1)]
+        self.coarse, self.codebooks = coarse.astype(np.float32), np.stack(codebooks).astype(np.float32)
+        np.savez(self._codebooks_path, coarse=self.coarse, codebooks=self.codebooks)
+        self._encode_rows(rows)
+
+    def _pq_encode(self, vectors:np.ndarray):
+        m = self.codebooks.shape[0]
+        codes = np.empty((len(vectors), m + 1), dtype=np.uint8)
+        codes[:, 0] = _nearest(vectors, self.coarse)
+        residuals = vectors - self.coarse[codes[:, 0]]
+        for j, (sub, centroids) in enumerate(zip(np.split(residuals, m, axis=1), self.codebooks)):
+            codes[:, j + 1] = _nearest(sub, centroids)
+        return codes
+
+    def _exact(self, rows:np.ndarray, query:np.ndarray, k:int):
+        """
+        Returns the `k` of `rows` nearest to `query` using float32 embeddings
+        """
+        rows = np.sort(rows)
+        similarities = _normalize(self._matrix[rows]) @ query
+        order = np.argsort(-similarities)[:k]
+        return rows[order].tolist(), (1 - similarities[order]).tolist()
+
+    def _search(self, embedding, k, allowed=None):
+        query = _normalize(embedding[None])[0]
+        valid = self._valid[:self._rows]
+        if allowed is not None:
+            valid = np.zeros(self._rows, dtype=bool)
+            valid[list(allowed)] = True
+        if self.quantization == 'pq' and self.codebooks is None:
+            # too few chunks to train centroids
+            return self._exact(np.flatnonzero(valid), query, k)
+        if self.quantization == 'pq':
+            m = self.codebooks.shape[0]
+            coarse = self.coarse @ query
+            table = np.einsum('md,mcd->mc', query.reshape(m, -1), self.codebooks)
+        n = k * self.rescore if self.rescore else k
+        rows, scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, self._rows, self.block_size):
+            stop = min(start + self.block_size, self._rows)
+            codes = self._codes[start:stop]
+            if self.quantization == 'int8':
+                block = (codes.astype(np.float32) @ query) * self._scales[start:stop, 0]
+            else:
+                block = coarse[codes[:, 0]] + table[np.arange(m), codes[:, 1:]].sum(axis=1)
+            mask = valid[start:stop]
+            rows = np.concatenate([rows, np.flatnonzero(mask) + start])
+            scores = np.concatenate([scores, block[mask]])
+            if len(scores) > n:
+                top = np.argpartition(-scores, n)[:n]
+                rows, scores = rows[top], scores[top]
+        if self.rescore:
+            return self._exact(rows, query, k)
+        order = np.argsort(-scores)[:k]
+        return rows[order].tolist(), (1 - scores[order]).tolist()
+
+    def _save_index(self):
+        self._codes.flush()
+        if self._scales is not None:
+            self._scales.flush()
+
+
+def _normalize(vectors:np.ndarray):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _nearest(x:np.ndarray, centroids:np.ndarray):
+    """
+    Returns the index of the centroid nearest to each row of `x`
+    """
+    return np.argmin((centroids ** 2).sum(axis=1) - 2 * x @ centroids.T, axis=1)
+
+
+def _kmeans(x:np.ndarray, k:int, iterations:int=20, seed:int=42):
+    """
+    Returns `k` centroids of the rows of `x` computed with Lloyd's algorithm
+    """
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, x)
+        counts = np.bincount(assignments, minlength=k)
+        centroids[counts > 0] = sums[counts > 0] / counts[counts > 0, None]
+    return centroids
+
+# %% ../nbs/07_vectorstore.ipynb 9
+class VectorDB(VectorStore):
+    def __init__(self, store:VectorStoreBase, embedding_function:Embeddings):
+        """
+        LangChain `VectorStore` backed by a `VectorStoreBase` instance.
+        Returned by `onprem.ingest.Ingester.get_db` for backends other than Chroma.
+        """
+        self.store = store
+        self.embedding_function = embedding_function
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def add_texts(self, texts:Iterable[str], metadatas:Optional[List[dict]]=None, ids:Optional[List[str]]=None, **kwargs):
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.store.upsert(ids, self.embedding_function.embed_documents(texts),
+                          metadatas or [None] * len(texts), texts)
+        self.store.persist()
+        return ids
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=['metadatas', 'documents']):
+        """
+        Returns stored chunks (see `VectorStoreBase.get`)
+        """
+        return self.store.get(ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def delete(self, ids:Optional[List[str]]=None, **kwargs):
+        if ids:
+            self.store.delete(ids)
+            self.store.persist()
+
+    def similarity_search_by_vector_with_score(self, embedding:List[float], k:int=4, filter:Optional[dict]=None):
+        """
+        Returns the `k` chunks nearest to `embedding` as a list of `(Document, distance)` tuples
+        """
+        results = self.store.query(embedding, k=k, where=filter)
+        return [(Document(id=id, page_content=document, metadata=metadata or {}), distance)
+                for id, document, metadata, distance
+                in zip(results['ids'], results['documents'], results['metadatas'], results['distances'])]
+
+    def similarity_search_with_score(self, query:str, k:int=4, filter:Optional[dict]=None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding:List[float], k:int=4, filter:Optional[dict]=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query:str, k:int=4, filter:Optional[dict]=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts:List[str], embedding:Embeddings, metadatas:Optional[List[dict]]=None,
+                   store:Optional[VectorStoreBase]=None, **kwargs):
+        if store is None:
+            raise ValueError('A store is required (e.g., store=HNSWStore(persist_directory)).')
+        db = cls(store, embedding)
+        db.add_texts(texts, metadatas=metadatas, **kwargs)
+        return db
+
+# %% ../nbs/07_vectorstore.ipynb 10
+STORE_BACKENDS = {'chroma': ChromaStore, 'hnsw': HNSWStore, 'quantized': QuantizedStore}
+
+def get_store(persist_directory:str, backend:str='chroma', **kwargs):
+    """
+    Returns the vector store for `backend` (one of `STORE_BACKENDS`) stored in `persist_directory`.
+    Extra kwargs are fed to the constructor of the store.
+    """
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f'backend must be one of {list(STORE_BACKENDS)}')
+    return STORE_BACKENDS[backend](persist_directory, **kwargs)